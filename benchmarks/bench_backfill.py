@@ -0,0 +1,107 @@
+"""
+Wall time and peak memory of a full historical backfill, by executor and
+transform block size.
+
+Each configuration runs the HTTP entry point's backfill path in a fresh
+subprocess against the local ECB stand-in server (started here) and a fake
+BigQuery client, and reports wall time, rows loaded and peak RSS:
+
+    python -m benchmarks.bench_backfill --start 1999-01-04 --currencies 40 --block-days 0 250 60
+    python -m benchmarks.bench_backfill --executor sequential pipelined --latency 0.5 --load-latency 0.5
+
+FX_TRANSFORM_BLOCK_DAYS=0 transforms and loads each missing range at once.
+--latency delays every ECB response and --load-latency every BigQuery load job.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import types
+from datetime import date
+
+from benchmarks.synthetic import synthetic_currencies
+
+
+def run_worker(args) -> None:
+    os.environ.update({
+        'ECB_CACHE_ENABLED': 'false',
+        'FX_SINK': 'bigquery',
+        'FX_WATERMARK_SOURCE': 'none',
+        'GCP_PROJECT_ID': 'bench-project',
+        'BIGQUERY_DATASET_ID': 'fx',
+        'BIGQUERY_TABLE_ID': 'fact_exchange_rates',
+    })
+    sys.modules.setdefault('functions_framework', types.SimpleNamespace(http=lambda f: f, cloud_event=lambda f: f))
+
+    from benchmarks.fakes import FakeBigQueryClient
+    from cloud_functions.utils import bigquery_client
+
+    bigquery_client._clients['bench-project'] = FakeBigQueryClient(latency=args.load_latency)
+    import main
+
+    request = types.SimpleNamespace(args={
+        'start_date': args.start, 'end_date': args.end, 'chunk': args.chunk, 'engine': args.engine,
+        'executor': args.executor[0],
+    })
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        body, status_code = main._load_requested_range(request)
+    wall_s = time.perf_counter() - start
+
+    print(json.dumps({
+        'status_code': status_code,
+        'rows': body.get('rows_inserted', 0),
+        'wall_s': round(wall_s, 3),
+        # ru_maxrss está en KiB en Linux.
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start', default='1999-01-04')
+    parser.add_argument('--end', default=date.today().isoformat())
+    parser.add_argument('--currencies', type=int, default=40)
+    parser.add_argument('--block-days', nargs='+', type=int, default=[0, 250, 60])
+    parser.add_argument('--chunk', choices=('year', 'month'), default='year')
+    parser.add_argument('--engine', choices=('threads', 'async'), default='threads')
+    parser.add_argument('--executor', nargs='+', choices=('sequential', 'pipelined'), default=['sequential'])
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every ECB response.")
+    parser.add_argument('--load-latency', type=float, default=0.0, help="Seconds spent on every load job.")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    from benchmarks.ecb_stub_server import running_ecb_stub
+
+    print(f"{'executor':<12}{'block days':<12}{'rows':>12}{'wall s':>10}{'peak RSS MB':>14}")
+    with running_ecb_stub(latency=args.latency) as server:
+        for executor, block_days in itertools.product(args.executor, args.block_days):
+            env = {
+                **os.environ,
+                'ECB_API_BASE_URL': server.base_url,
+                'FX_CURRENCIES': ','.join(synthetic_currencies(args.currencies)),
+                'FX_TRANSFORM_BLOCK_DAYS': str(block_days),
+            }
+            completed = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_backfill', '--worker', '--start', args.start,
+                 '--end', args.end, '--chunk', args.chunk, '--engine', args.engine, '--executor', executor,
+                 '--load-latency', str(args.load_latency)],
+                env=env, capture_output=True, text=True, check=True,
+            )
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            if result['status_code'] != 200:
+                raise RuntimeError(f"{executor}, block_days={block_days}: HTTP {result['status_code']}")
+            print(f"{executor:<12}{block_days:<12}{result['rows']:>12}{result['wall_s']:>10.2f}{result['peak_rss_mb']:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
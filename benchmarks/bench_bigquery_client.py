@@ -0,0 +1,117 @@
+"""
+Benchmark cold vs. warm BigQuery client usage with a stubbed HTTP transport.
+
+A cold invocation builds a new client (as a fresh Cloud Function instance
+does), a warm one reuses the process-wide client from get_bigquery_client.
+Each invocation issues one tables.get call. Credentials are resolved for
+real from a generated service-account key (GOOGLE_APPLICATION_CREDENTIALS),
+so a cold invocation also signs a JWT and exchanges it for an access token;
+only the HTTP transport is stubbed (a requests adapter answering the token,
+allowedLocations and tables.get calls locally):
+
+    python -m benchmarks.bench_bigquery_client --invocations 200
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cloud_functions.utils import bigquery_client
+from cloud_functions.utils.bigquery_client import get_bigquery_client
+
+PROJECT_ID = 'bench-project'
+TABLE_ID = f'{PROJECT_ID}.fx.fact_exchange_rates'
+TOKEN_URI = 'https://oauth2.googleapis.com/token'
+
+
+def _private_key_pem() -> str:
+    # google-auth firma el JWT con cryptography si está instalado y, si no, con rsa.
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+    except ImportError:
+        import rsa
+
+        return rsa.newkeys(2048)[1].save_pkcs1().decode('ascii')
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode('ascii')
+
+
+def write_service_account_key(directory: str) -> str:
+    """
+    Write a service-account key file for PROJECT_ID with a fresh RSA key.
+
+    Returns:
+        The path of the JSON key file.
+    """
+    path = os.path.join(directory, 'bench-service-account.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'type': 'service_account',
+            'project_id': PROJECT_ID,
+            'private_key_id': 'bench',
+            'private_key': _private_key_pem(),
+            'client_email': f'bench@{PROJECT_ID}.iam.gserviceaccount.com',
+            'client_id': '0',
+            'token_uri': TOKEN_URI,
+        }, f)
+    return path
+
+
+def _stub_send(self, request, **kwargs):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    if request.url.startswith(TOKEN_URI):
+        body = {'access_token': 'bench-token', 'expires_in': 3600, 'token_type': 'Bearer'}
+    elif request.url.endswith('/allowedLocations'):
+        # Consulta de Regional Access Boundary de las versiones recientes de google-auth.
+        body = {'encodedLocations': '0x0', 'locations': []}
+    else:
+        body = {
+            'tableReference': dict(zip(('projectId', 'datasetId', 'tableId'), TABLE_ID.split('.'))),
+            'schema': {'fields': []},
+        }
+    response._content = json.dumps(body).encode('utf-8')
+    response.request = request
+    response.url = request.url
+    return response
+
+
+def run_invocations(invocations: int, warm: bool) -> list[float]:
+    timings = []
+    for _ in range(invocations):
+        if not warm:
+            bigquery_client._clients.clear()
+        start = time.perf_counter()
+        get_bigquery_client(PROJECT_ID).get_table(TABLE_ID)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--invocations', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory, mock.patch.object(HTTPAdapter, 'send', _stub_send), \
+            mock.patch.dict(os.environ, GOOGLE_APPLICATION_CREDENTIALS=write_service_account_key(directory)):
+        get_bigquery_client(PROJECT_ID).get_table(TABLE_ID)
+
+        print(f"{'mode':<8}{'invocations':>12}{'median ms':>12}{'p95 ms':>10}")
+        for mode, warm in (('cold', False), ('warm', True)):
+            timings = sorted(run_invocations(args.invocations, warm))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{mode:<8}{len(timings):>12}{statistics.median(timings) * 1e3:>12.3f}{p95 * 1e3:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
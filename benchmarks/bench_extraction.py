@@ -0,0 +1,51 @@
+"""
+Benchmark the extraction engines against the local ECB stand-in server.
+
+Runs the thread-pool and asyncio engines over the same date range, with the
+server adding latency and random 429 / 5xx answers, and reports wall time,
+rows and the HTTP statuses the server returned:
+
+    python -m benchmarks.bench_extraction --start 1999-01-04 --end 2024-12-31 --chunk month --latency 0.05 --rate-429 0.02
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+os.environ["ECB_CACHE_ENABLED"] = "false"
+
+from benchmarks.ecb_stub_server import running_ecb_stub
+from cloud_functions.fetch_ecb_data_for_ytd.main import EXTRACTION_ENGINES, _get_extraction_engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start', default='2015-01-01')
+    parser.add_argument('--end', default='2024-12-31')
+    parser.add_argument('--chunk', choices=('year', 'month'), default='month')
+    parser.add_argument('--engines', nargs='+', choices=EXTRACTION_ENGINES, default=list(EXTRACTION_ENGINES))
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.02)
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--gap-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    print(f"{'engine':<10}{'wall s':>10}{'rows':>10}  statuses")
+    for engine in args.engines:
+        with running_ecb_stub(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+                              rate_5xx=args.rate_5xx, retry_after=0, gap_rate=args.gap_rate) as server:
+            os.environ["ECB_API_BASE_URL"] = server.base_url
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = _get_extraction_engine(engine)(args.start, args.end, chunk=args.chunk)
+            wall_s = time.perf_counter() - start
+
+        rows = len(result) if hasattr(result, 'shape') else result
+        statuses = ', '.join(f"{status}: {count}" for status, count in sorted(server.status_counts.items()))
+        print(f"{engine:<10}{wall_s:>10.3f}{rows!s:>10}  {statuses}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Measure module import cost (`python -X importtime`) of the Cloud Function entry points.
+
+Each scenario runs in a fresh interpreter, as a cold start would:
+
+- import:       `import main`
+- daily-loaded: `import main` plus a daily run where every business date of the
+                catch-up window is already loaded, so the ECB is not called
+- daily-304:    `import main` plus a daily run with missing dates where the ECB
+                answers 304 Not Modified
+
+The BigQuery REST session and the ECB HTTP session are stubbed (no network
+access); the watermark queries go through the REST API, as in production.
+
+For every scenario the total import time, the slowest top-level imports and
+whether pandas / numpy / pyarrow / google.cloud.bigquery were loaded are printed:
+
+    python -m benchmarks.bench_importtime --top 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ('pandas', 'numpy', 'pyarrow', 'google.cloud.bigquery', 'httpx')
+
+_IMPORT_MAIN = "import main\n"
+_STUB_PARTITIONS = """
+from datetime import date, timedelta
+from unittest import mock
+import main
+from cloud_functions.utils import commons
+
+DAYS = [date.today() - timedelta(days=d) for d in range({days})]
+PAIRS = len(commons.TARGET_CURRENCIES) ** 2
+
+def answer(url, json, timeout):
+    # Respuesta de jobs.query: particiones (INFORMATION_SCHEMA) o divisas por fecha.
+    if 'INFORMATION_SCHEMA' in json['query']:
+        fields = [{{'name': 'partition_id', 'type': 'STRING'}}, {{'name': 'total_rows', 'type': 'INTEGER'}}]
+        rows = [[day.strftime('%Y%m%d'), str(PAIRS)] for day in DAYS]
+    else:
+        fields = [{{'name': 'exchange_date', 'type': 'DATE'}},
+                  {{'name': 'currencies', 'type': 'STRING', 'mode': 'REPEATED'}}]
+        rows = [[day.isoformat(), [{{'v': c}} for c in commons.TARGET_CURRENCIES]] for day in DAYS]
+    body = {{'jobReference': {{'jobId': 'bench'}}, 'jobComplete': True, 'schema': {{'fields': fields}},
+            'rows': [{{'f': [{{'v': v}} for v in row]}} for row in rows]}}
+    return mock.Mock(json=mock.Mock(return_value=body))
+
+# Credenciales y transporte simulados; get_bigquery_session importa google.auth como en producción.
+import google.auth
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+mock.patch.object(google.auth, 'default', return_value=(AnonymousCredentials(), 'bench')).start()
+mock.patch.object(AuthorizedSession, 'post', side_effect=answer).start()
+"""
+_DAILY_ALL_LOADED = _STUB_PARTITIONS.format(days=30) + """
+main.update_today_ebc_data_function(None)
+"""
+_DAILY_NOT_MODIFIED = _STUB_PARTITIONS.format(days=0) + """
+response = mock.Mock(status_code=304)
+with mock.patch.object(commons, 'get_ecb_session') as get_session:
+    get_session.return_value.get.return_value = response
+    main.update_today_ebc_data_function(None)
+"""
+SCENARIOS = {
+    'import': _IMPORT_MAIN,
+    'daily-loaded': _DAILY_ALL_LOADED,
+    'daily-304': _DAILY_NOT_MODIFIED,
+}
+_REPORT_LOADED = """
+import sys
+print('LOADED:' + ','.join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """
+    Parse `-X importtime` output into (module, self_us, cumulative_us) rows.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((module[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_scenario(code: str) -> tuple[list[tuple[str, int, int]], list[str]]:
+    env = dict(os.environ, GCP_PROJECT_ID='bench', BIGQUERY_DATASET_ID='fx', BIGQUERY_TABLE_ID='fact',
+               ECB_STATE_PATH=os.path.join(tempfile.gettempdir(), 'bench_fx_ecb_state.json'),
+               ECB_CACHE_ENABLED='false')
+    script = code + _REPORT_LOADED.format(heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', script],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    loaded = next(line for line in result.stdout.splitlines() if line.startswith('LOADED:'))
+    return parse_importtime(result.stderr), [m for m in loaded[len('LOADED:'):].split(',') if m]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--scenario', choices=tuple(SCENARIOS), action='append')
+    args = parser.parse_args()
+
+    for name in args.scenario or SCENARIOS:
+        rows, loaded = run_scenario(SCENARIOS[name])
+        top_level = [row for row in rows if not row[0].startswith(' ')]
+        total_ms = sum(cumulative for _, _, cumulative in top_level) / 1e3
+
+        print(f"== {name}: {total_ms:.1f} ms de imports, {len(rows)} módulos")
+        print(f"   módulos pesados cargados: {', '.join(loaded) or 'ninguno'}")
+        for module, _, cumulative in sorted(top_level, key=lambda row: row[2], reverse=True)[:args.top]:
+            print(f"   {cumulative / 1e3:>9.1f} ms  {module.strip()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark the serialization step of the BigQuery load on a synthetic fact table.
+
+Compares the previous path (pandas type coercion + pyarrow inference, as
+load_table_from_dataframe does) with the explicit-schema Arrow table written
+as in-memory Parquet with each codec:
+
+    python -m benchmarks.bench_parquet_load --days 6500
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cloud_functions.utils.commons import TARGET_CURRENCIES, transform_to_fact_table
+from cloud_functions.utils.load_strategies import build_fact_arrow_table, write_parquet_buffer
+
+CODECS = ('snappy', 'zstd', 'gzip')
+
+
+def synthetic_fact_table(days: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('1999-01-04', periods=days).strftime('%Y-%m-%d')
+    rates = np.round(rng.uniform(0.5, 30.0, size=(days, len(TARGET_CURRENCIES))), 4)
+    rates[:, TARGET_CURRENCIES.index('EUR')] = 1.0
+    df_base_rates = pd.DataFrame({
+        'exchange_date': np.repeat(dates, len(TARGET_CURRENCIES)),
+        'quote_currency': np.tile(TARGET_CURRENCIES, days),
+        'rate': rates.ravel(),
+    })
+    return transform_to_fact_table(df_base_rates)
+
+
+def inferred_parquet(df_fact: pd.DataFrame) -> io.BytesIO:
+    df = df_fact.copy()
+    df['exchange_date'] = pd.to_datetime(df['exchange_date']).dt.date
+    df['load_timestamp'] = pd.to_datetime(df['load_timestamp'])
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), buffer, compression='snappy')
+    return buffer
+
+
+def explicit_parquet(df_fact: pd.DataFrame, codec: str) -> io.BytesIO:
+    return write_parquet_buffer(build_fact_arrow_table(df_fact), compression=codec)
+
+
+def bench(serialize, repeat: int) -> tuple[float, int]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        buffer = serialize()
+        timings.append(time.perf_counter() - start)
+    return min(timings), buffer.getbuffer().nbytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=6500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df_fact = synthetic_fact_table(args.days)
+
+    cases = [('inferred/snappy', lambda: inferred_parquet(df_fact))]
+    cases += [(f'explicit/{codec}', lambda codec=codec: explicit_parquet(df_fact, codec)) for codec in CODECS]
+
+    print(f"{'path':<20}{'rows':>10}{'best s':>10}{'MB':>10}")
+    for name, serialize in cases:
+        best, size = bench(serialize, args.repeat)
+        print(f"{name:<20}{len(df_fact):>10}{best:>10.4f}{size / 1e6:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Benchmark the extract (parse), transform and load stages on synthetic ECB data.
+
+Every case combines a date range (1 day to 25 years of business days) with a
+currency universe (7 to 40 currencies, EUR included). The extract stage runs
+fetch_ecb_data_for_ytd against an in-process ECB session, and the load stage
+runs load_to_bigquery against a fake BigQuery client. Best-of-N time, rows/s
+and tracemalloc peak are reported for each stage:
+
+    python -m benchmarks.bench_pipeline --save benchmarks/baselines/pipeline.json
+    python -m benchmarks.bench_pipeline --baseline benchmarks/baselines/pipeline.json
+
+`--fact-model compact` (EUR/X base rates only) and `--fact-model triangular`
+(pairs with base < quote only) benchmark the models whose other pairs are
+derived by a view in the destination, as `<range>/<N>/<model>` cases.
+`--pairs "EUR/*,USD/*"` restricts the transform to a FX_PAIRS whitelist
+(`<range>/<N>/pairs` cases).
+
+With --baseline, cases whose rows/s dropped or whose peak memory grew by more
+than --threshold are reported and the script exits with status 1.
+"""
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest import mock
+
+os.environ["ECB_CACHE_ENABLED"] = "false"
+
+from benchmarks.fakes import FakeBigQueryClient, FakeEcbSession
+from benchmarks.synthetic import SDMX_GENERATORS, synthetic_currencies, synthetic_dates
+from cloud_functions.utils import bigquery_client, commons
+from cloud_functions.utils.cross_rates import FX_FACT_MODELS
+
+BASELINE_DIR = Path(__file__).parent / 'baselines'
+DATE_RANGES = {
+    '1d': 1,
+    '1m': 22,
+    '1y': 261,
+    '5y': 1305,
+    '25y': 6525,
+}
+CURRENCY_COUNTS = (7, 15, 30, 40)
+PROJECT_ID = 'bench-project'
+TABLE_ID = f'{PROJECT_ID}.fx.fact_exchange_rates'
+
+
+def _measure(func, repeat: int, trace_memory: bool) -> tuple[object, float, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result, min(timings), peak_mb
+
+
+def _result(case: str, stage: str, rows: int, best_s: float, peak_mb) -> dict:
+    return {
+        'case': case,
+        'stage': stage,
+        'rows': rows,
+        'best_s': round(best_s, 6),
+        'rows_per_s': round(rows / best_s, 1) if best_s > 0 else None,
+        'peak_mb': None if peak_mb is None else round(peak_mb, 3),
+    }
+
+
+def bench_case(range_name: str, n_currencies: int, data_format: str, repeat: int, trace_memory: bool,
+               fact_model: str = 'full', pairs: str = None) -> list[dict]:
+    currencies = synthetic_currencies(n_currencies)
+    dates = synthetic_dates('1999-01-04', DATE_RANGES[range_name])
+    payload = SDMX_GENERATORS[data_format](currencies, dates)
+    case = f"{range_name}/{n_currencies}" + ('' if fact_model == 'full' else f"/{fact_model}") + ('/pairs' if pairs else '')
+    if fact_model == 'compact':
+        transform = commons.transform_to_base_rate_table
+    else:
+        with mock.patch.dict(os.environ, {'FX_PAIRS': pairs or ''}):
+            pair_rules = commons.get_pair_rules()
+        transform = functools.partial(commons.transform_to_fact_table, upper_triangular=fact_model == 'triangular',
+                                      pairs=pair_rules)
+
+    session = FakeEcbSession(payload)
+    client = FakeBigQueryClient()
+    bigquery_client._clients[PROJECT_ID] = client
+
+    # Los logs JSON por etapa se descartan para no falsear las medidas de E/S.
+    with mock.patch.object(commons, 'get_ecb_session', return_value=session), \
+            mock.patch.dict(os.environ, {'FX_CURRENCIES': ','.join(currencies)}), \
+            contextlib.redirect_stdout(io.StringIO()):
+        df_base, extract_s, extract_peak = _measure(
+            lambda: commons.fetch_ecb_data_for_ytd(dates[0], dates[-1], data_format=data_format),
+            repeat, trace_memory,
+        )
+        df_fact, transform_s, transform_peak = _measure(
+            lambda: transform(df_base), repeat, trace_memory,
+        )
+        load_result, load_s, load_peak = _measure(
+            lambda: commons.load_to_bigquery(df_fact, PROJECT_ID, TABLE_ID, 'append'), repeat, trace_memory,
+        )
+
+    if load_result['status'] != 'success':
+        raise RuntimeError(f"{case}: {load_result['message']}")
+
+    return [
+        _result(case, 'extract', len(df_base), extract_s, extract_peak) | {'payload_mb': round(len(payload) / 1e6, 3)},
+        _result(case, 'transform', len(df_fact), transform_s, transform_peak),
+        _result(case, 'load', len(df_fact), load_s, load_peak) | {'parquet_mb': round(client.bytes_loaded / (repeat + trace_memory) / 1e6, 3)},
+    ]
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """
+    Regressions of `results` against a saved baseline, as printable lines.
+    """
+    previous = {(r['case'], r['stage']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['case'], result['stage']))
+        if before is None:
+            continue
+        if before['rows_per_s'] and result['rows_per_s'] < before['rows_per_s'] * (1 - threshold):
+            regressions.append(
+                f"{result['case']:<8}{result['stage']:<10} rows/s {before['rows_per_s']:,.0f} -> {result['rows_per_s']:,.0f}"
+            )
+        if before['peak_mb'] and result['peak_mb'] and result['peak_mb'] > before['peak_mb'] * (1 + threshold):
+            regressions.append(
+                f"{result['case']:<8}{result['stage']:<10} peak MB {before['peak_mb']:.2f} -> {result['peak_mb']:.2f}"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ranges', nargs='+', choices=tuple(DATE_RANGES), default=list(DATE_RANGES))
+    parser.add_argument('--currencies', nargs='+', type=int, default=list(CURRENCY_COUNTS))
+    parser.add_argument('--format', choices=tuple(SDMX_GENERATORS), default='json')
+    parser.add_argument('--fact-model', choices=FX_FACT_MODELS, default='full')
+    parser.add_argument('--pairs', help="FX_PAIRS whitelist, e.g. 'EUR/*,USD/*'.")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc run of each stage.")
+    parser.add_argument('--save', type=Path)
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f"{'case':<20}{'stage':<11}{'rows':>11}{'best s':>10}{'rows/s':>14}{'peak MB':>10}")
+    results = []
+    for range_name in args.ranges:
+        for n_currencies in args.currencies:
+            for result in bench_case(range_name, n_currencies, args.format, args.repeat, not args.no_memory,
+                                     args.fact_model, args.pairs):
+                results.append(result)
+                peak = '-' if result['peak_mb'] is None else f"{result['peak_mb']:.2f}"
+                print(
+                    f"{result['case']:<20}{result['stage']:<11}{result['rows']:>11}"
+                    f"{result['best_s']:>10.4f}{result['rows_per_s']:>14,.0f}{peak:>10}"
+                )
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps({
+            'meta': {
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'format': args.format,
+                'fact_model': args.fact_model,
+                'pairs': args.pairs,
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }, indent=2) + '\n')
+        print(f"Resultados guardados en {args.save}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold)
+        if regressions:
+            print(f"Regresiones frente a {args.baseline} (umbral {args.threshold:.0%}):")
+            print('\n'.join(regressions))
+            sys.exit(1)
+        print(f"Sin regresiones frente a {args.baseline}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark the SDMX-JSON and SDMX-CSV parsers on recorded ECB payloads.
+
+Record a payload pair (same window in both formats) from the live API:
+
+    python -m benchmarks.bench_sdmx_formats --record 1999-01-04 2025-11-07
+
+Then compare both extraction paths on every recorded pair:
+
+    python -m benchmarks.bench_sdmx_formats
+"""
+import argparse
+import io
+import time
+import tracemalloc
+from pathlib import Path
+
+import requests
+
+from cloud_functions.utils.commons import BASE_CURRENCY, ECB_DATA_FORMATS, build_ecb_url
+from cloud_functions.utils.sdmx import parse_sdmx_csv, parse_sdmx_json
+
+PAYLOAD_DIR = Path(__file__).parent / 'payloads'
+PARSERS = {
+    'json': parse_sdmx_json,
+    'csv': parse_sdmx_csv,
+}
+
+
+def record_payloads(start_date: str, end_date: str, payload_dir: Path) -> None:
+    payload_dir.mkdir(parents=True, exist_ok=True)
+    for data_format, mime_type in ECB_DATA_FORMATS.items():
+        url = build_ecb_url(start_date, end_date, data_format)
+        response = requests.get(url, headers={'Accept': mime_type}, timeout=(5, 300))
+        response.raise_for_status()
+        path = payload_dir / f"{start_date}_{end_date}.{data_format}"
+        path.write_bytes(response.content)
+        print(f"Grabado {path} ({len(response.content) / 1e6:.2f} MB)")
+
+
+def bench_parser(data_format: str, payload: bytes, repeat: int) -> dict:
+    parser = PARSERS[data_format]
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = parser(io.BytesIO(payload), BASE_CURRENCY)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parser(io.BytesIO(payload), BASE_CURRENCY)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'format': data_format,
+        'payload_mb': len(payload) / 1e6,
+        'rows': len(df),
+        'best_s': min(timings),
+        'rows_per_s': len(df) / min(timings),
+        'peak_mb': peak / 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payload-dir', type=Path, default=PAYLOAD_DIR)
+    parser.add_argument('--record', nargs=2, metavar=('START_DATE', 'END_DATE'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.record:
+        record_payloads(*args.record, args.payload_dir)
+
+    windows = sorted({path.stem for path in args.payload_dir.glob('*.json')})
+    if not windows:
+        raise SystemExit(f"No hay payloads grabados en {args.payload_dir}. Usa --record START END.")
+
+    print(f"{'window':<24}{'format':<8}{'MB':>8}{'rows':>10}{'best s':>10}{'rows/s':>14}{'peak MB':>10}")
+    for window in windows:
+        for data_format in PARSERS:
+            path = args.payload_dir / f"{window}.{data_format}"
+            if not path.exists():
+                continue
+            result = bench_parser(data_format, path.read_bytes(), args.repeat)
+            print(
+                f"{window:<24}{result['format']:<8}{result['payload_mb']:>8.2f}{result['rows']:>10}"
+                f"{result['best_s']:>10.4f}{result['rows_per_s']:>14,.0f}{result['peak_mb']:>10.2f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
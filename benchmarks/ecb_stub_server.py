@@ -0,0 +1,188 @@
+"""
+Local stand-in for the ECB data API (`/service/data/EXR/<key>`).
+
+Serves synthetic SDMX-JSON or SDMX-CSV for any `D.<CUR>+<CUR>.EUR.SP00.A` key
+and startPeriod/endPeriod window (TARGET holidays excluded, optional gaps),
+with configurable latency and random 429 / 5xx answers:
+
+    python -m benchmarks.ecb_stub_server --port 8765 --latency 0.05 --rate-429 0.05 --rate-5xx 0.02
+    ECB_API_BASE_URL=http://127.0.0.1:8765/service/data FX_SINK=memory functions-framework --target etl_fx_load_all_year_data_function --port 8080
+    curl "http://127.0.0.1:8080?start_date=2024-01-01&end_date=2024-12-31"
+
+The server honours Accept / format=csvdata, gzip Accept-Encoding, ETag /
+If-None-Match and updatedAfter (answered with 304 once the data has been served).
+"""
+import argparse
+import contextlib
+import functools
+import gzip
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.synthetic import SDMX_GENERATORS, synthetic_business_dates, synthetic_currencies
+
+SERIES_PATH = re.compile(r'^/service/data/EXR/(?P<key>[^/?]+)$')
+SERVER_ERROR_CODES = (500, 502, 503, 504)
+CONTENT_TYPES = {
+    'json': 'application/vnd.sdmx.data+json;version=1.0.0-wd',
+    'csv': 'text/csv',
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _render(currencies: tuple, start_date: str, end_date: str, data_format: str, seed: int, gap_rate: float):
+    dates = synthetic_business_dates(start_date, end_date)
+    if not dates:
+        return None
+    return SDMX_GENERATORS[data_format](list(currencies), dates, seed=seed, gap_rate=gap_rate)
+
+
+class EcbStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: 'EcbStubServer'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, body: bytes = b'', headers: dict = None) -> None:
+        self.server.count(status)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        config = self.server
+        if config.latency:
+            time.sleep(config.latency + random.uniform(0, config.jitter))
+
+        roll = random.random()
+        if roll < config.rate_429:
+            return self._send(429, b'Too Many Requests', {'Retry-After': str(config.retry_after)})
+        if roll < config.rate_429 + config.rate_5xx:
+            return self._send(random.choice(SERVER_ERROR_CODES), b'Server Error')
+
+        parts = urlsplit(self.path)
+        match = SERIES_PATH.match(parts.path)
+        query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+        if match is None or 'startPeriod' not in query or 'endPeriod' not in query:
+            return self._send(400, b'Bad Request')
+
+        # D.<CUR>+<CUR>.EUR.SP00.A; una dimensión vacía equivale a todas las divisas.
+        dimensions = match.group('key').split('.')
+        requested = dimensions[1].split('+') if len(dimensions) > 1 and dimensions[1] else []
+        currencies = tuple(['EUR'] + requested) if requested else tuple(synthetic_currencies(40))
+
+        if 'updatedAfter' in query:
+            updated_after = datetime.fromisoformat(query['updatedAfter'])
+            if updated_after.tzinfo is None:
+                updated_after = updated_after.replace(tzinfo=timezone.utc)
+            if updated_after >= config.published_at:
+                return self._send(304)
+
+        data_format = 'csv' if query.get('format') == 'csvdata' or 'text/csv' in self.headers.get('Accept', '') else 'json'
+        payload = _render(currencies, query['startPeriod'], query['endPeriod'], data_format, config.seed, config.gap_rate)
+        if payload is None:
+            return self._send(404, b'No results found.')
+
+        etag = f'"{hashlib.sha256(payload).hexdigest()[:16]}"'
+        if self.headers.get('If-None-Match') == etag:
+            return self._send(304, headers={'ETag': etag})
+
+        headers = {
+            'Content-Type': CONTENT_TYPES[data_format],
+            'ETag': etag,
+            'Last-Modified': format_datetime(config.published_at, usegmt=True),
+        }
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            payload = gzip.compress(payload, compresslevel=1)
+            headers['Content-Encoding'] = 'gzip'
+        self._send(200, payload, headers)
+
+
+class EcbStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency: float = 0.0, jitter: float = 0.0,
+                 rate_429: float = 0.0, rate_5xx: float = 0.0, retry_after: int = 1,
+                 gap_rate: float = 0.0, seed: int = 0, verbose: bool = False):
+        super().__init__(address, EcbStubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.gap_rate = gap_rate
+        self.seed = seed
+        self.verbose = verbose
+        self.published_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self.status_counts = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/service/data"
+
+    def count(self, status: int) -> None:
+        with self._lock:
+            self.status_counts[status] += 1
+
+
+@contextlib.contextmanager
+def running_ecb_stub(**config):
+    """
+    Run an EcbStubServer on a free local port in a background thread.
+
+    Yields:
+        The running server; pass `server.base_url` as the ECB base URL.
+    """
+    server = EcbStubServer(**config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response.")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random latency (0..jitter seconds).")
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--gap-rate', type=float, default=0.0, help="Fraction of observations left out.")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = EcbStubServer(
+        (args.host, args.port), latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx, retry_after=args.retry_after, gap_rate=args.gap_rate, seed=args.seed, verbose=True,
+    )
+    print(f"ECB stub escuchando en {server.base_url} (datos publicados {server.published_at.isoformat()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+In-process stand-ins for the ECB HTTP session and the BigQuery client, so the
+pipeline stages can be benchmarked without network access or GCP credentials.
+"""
+import io
+import time
+import types
+
+import pyarrow.parquet as pq
+
+
+class FakeEcbResponse:
+    """
+    Minimal requests.Response: streams `payload` in chunks and reports the
+    bytes "downloaded" through raw.tell().
+    """
+
+    def __init__(self, payload: bytes, status_code: int = 200, headers: dict = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._payload = payload
+        self._position = 0
+        self.raw = types.SimpleNamespace(tell=lambda: self._position)
+
+    def iter_content(self, chunk_size):
+        view = memoryview(self._payload)
+        for start in range(0, len(view), chunk_size):
+            self._position = min(start + chunk_size, len(view))
+            yield bytes(view[start:self._position])
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def close(self):
+        pass
+
+
+class FakeEcbSession:
+    """
+    requests.Session stand-in that answers every GET with the same payload.
+    """
+
+    def __init__(self, payload: bytes):
+        self.payload = payload
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(url)
+        return FakeEcbResponse(self.payload)
+
+
+class FakeLoadJob:
+    def __init__(self, output_rows: int, latency: float = 0.0):
+        self.output_rows = output_rows
+        self.latency = latency
+        self.dml_stats = types.SimpleNamespace(inserted_row_count=output_rows, updated_row_count=0)
+
+    def result(self):
+        if self.latency:
+            time.sleep(self.latency)
+        return self
+
+
+class FakeBigQueryClient:
+    """
+    bigquery.Client stand-in for load jobs: the Parquet payload is fully read
+    (so serialization is part of the measurement) and its row count returned.
+    `latency` seconds are spent waiting on every load job, as on a real job.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.bytes_loaded = 0
+        self.latency = latency
+
+    def load_table_from_file(self, file_obj, destination, job_config=None):
+        payload = file_obj.read()
+        self.bytes_loaded += len(payload)
+        return FakeLoadJob(pq.ParquetFile(io.BytesIO(payload)).metadata.num_rows, latency=self.latency)
+
+    def get_table(self, table_id):
+        return types.SimpleNamespace(schema=[])
+
+    def create_table(self, table, exists_ok=False):
+        return table
+
+    def query(self, query, job_config=None):
+        return FakeLoadJob(0)
+
+    def delete_table(self, table_id, not_found_ok=False):
+        pass
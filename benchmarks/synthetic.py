@@ -0,0 +1,129 @@
+"""
+Synthetic ECB SDMX payloads (JSON and CSV) shaped like the EXR dataflow responses.
+"""
+import json
+from datetime import date, timedelta
+
+import numpy as np
+
+from cloud_functions.utils.commons import BASE_CURRENCY, TARGET_CURRENCIES
+from cloud_functions.utils.watermarks import business_dates
+
+# Divisas cotizadas por el BCE (actuales e históricas) para escalar el universo hasta 40.
+ECB_QUOTED_CURRENCIES = [
+    'USD', 'JPY', 'BGN', 'GBP', 'HUF', 'CHF', 'ISK', 'TRY', 'AUD', 'BRL',
+    'CAD', 'CNY', 'HKD', 'IDR', 'ILS', 'INR', 'KRW', 'MXN', 'MYR', 'NZD',
+    'PHP', 'SGD', 'THB', 'ZAR', 'HRK', 'RUB', 'CYP', 'EEK', 'LTL', 'LVL',
+    'MTL', 'SIT', 'SKK', 'ROL', 'TRL',
+]
+
+
+def synthetic_currencies(n_currencies: int) -> list[str]:
+    """
+    The repo's TARGET_CURRENCIES (EUR included) extended with other ECB
+    currencies up to `n_currencies`.
+    """
+    extra = [c for c in ECB_QUOTED_CURRENCIES if c not in TARGET_CURRENCIES]
+    currencies = TARGET_CURRENCIES + extra
+    if not 1 <= n_currencies <= len(currencies):
+        raise ValueError(f"Entre 1 y {len(currencies)} divisas.")
+    return currencies[:n_currencies]
+
+
+def synthetic_dates(start_date: str, n_days: int) -> list[str]:
+    """
+    `n_days` consecutive weekdays starting at `start_date`, in ISO format.
+    """
+    dates = []
+    current = date.fromisoformat(start_date)
+    while len(dates) < n_days:
+        if current.weekday() < 5:
+            dates.append(current.isoformat())
+        current += timedelta(days=1)
+    return dates
+
+
+def synthetic_business_dates(start_date: str, end_date: str) -> list[str]:
+    """
+    ECB publication days (weekdays except TARGET holidays) in [start_date, end_date].
+    """
+    return [d.isoformat() for d in business_dates(date.fromisoformat(start_date), date.fromisoformat(end_date))]
+
+
+def synthetic_rates(currencies: list[str], dates: list[str], seed: int = 0) -> np.ndarray:
+    """
+    A dates x quoted-currencies matrix of positive EUR/X rates (random walks,
+    four decimals like the ECB reference rates).
+    """
+    rng = np.random.default_rng(seed)
+    quoted = [c for c in currencies if c != BASE_CURRENCY]
+    levels = rng.uniform(0.5, 200.0, size=len(quoted))
+    steps = rng.normal(0.0, 0.003, size=(len(dates), len(quoted)))
+    return np.round(levels * np.exp(np.cumsum(steps, axis=0)), 4)
+
+
+def _observations(currencies: list[str], dates: list[str], seed: int, gap_rate: float):
+    # (rates, present): present[t][i] is False for the observations dropped as gaps.
+    rates = synthetic_rates(currencies, dates, seed)
+    present = np.random.default_rng(seed + 1).random(rates.shape) >= gap_rate
+    return rates.tolist(), present.tolist()
+
+
+def make_sdmx_json(currencies: list[str], dates: list[str], seed: int = 0, gap_rate: float = 0.0) -> bytes:
+    """
+    SDMX-JSON payload with one series per quoted currency. A `gap_rate`
+    fraction of the observations is left out, as for missing ECB fixings.
+    """
+    quoted = [c for c in currencies if c != BASE_CURRENCY]
+    rates, present = _observations(currencies, dates, seed, gap_rate)
+    series = {
+        f"0:{i}:0:0:0": {
+            'attributes': [0, None, 0, None, None, None, 0, None, 0],
+            'observations': {
+                str(t): [rates[t][i], 0, None, None, None] for t in range(len(dates)) if present[t][i]
+            },
+        }
+        for i in range(len(quoted))
+    }
+    payload = {
+        'header': {'id': 'synthetic', 'test': True, 'prepared': f"{dates[-1]}T00:00:00Z"},
+        'dataSets': [{'action': 'Replace', 'series': series}],
+        'structure': {
+            'dimensions': {
+                'series': [
+                    {'id': 'FREQ', 'values': [{'id': 'D', 'name': 'Daily'}]},
+                    {'id': 'CURRENCY', 'values': [{'id': c, 'name': c} for c in quoted]},
+                    {'id': 'CURRENCY_DENOM', 'values': [{'id': BASE_CURRENCY, 'name': 'Euro'}]},
+                    {'id': 'EXR_TYPE', 'values': [{'id': 'SP00', 'name': 'Spot'}]},
+                    {'id': 'EXR_SUFFIX', 'values': [{'id': 'A', 'name': 'Average'}]},
+                ],
+                'observation': [
+                    {'id': 'TIME_PERIOD', 'role': 'time', 'values': [{'id': d, 'name': d} for d in dates]},
+                ],
+            },
+        },
+    }
+    return json.dumps(payload).encode('utf-8')
+
+
+def make_sdmx_csv(currencies: list[str], dates: list[str], seed: int = 0, gap_rate: float = 0.0) -> bytes:
+    """
+    SDMX-CSV (format=csvdata) payload with the same observations as make_sdmx_json.
+    """
+    quoted = [c for c in currencies if c != BASE_CURRENCY]
+    rates, present = _observations(currencies, dates, seed, gap_rate)
+    lines = ['KEY,FREQ,CURRENCY,CURRENCY_DENOM,EXR_TYPE,EXR_SUFFIX,TIME_PERIOD,OBS_VALUE,OBS_STATUS,TITLE']
+    for i, currency in enumerate(quoted):
+        key = f"EXR.D.{currency}.{BASE_CURRENCY}.SP00.A"
+        title = f'"{currency}/{BASE_CURRENCY}, Spot"'
+        lines.extend(
+            f"{key},D,{currency},{BASE_CURRENCY},SP00,A,{d},{rates[t][i]!r},A,{title}"
+            for t, d in enumerate(dates) if present[t][i]
+        )
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+SDMX_GENERATORS = {
+    'json': make_sdmx_json,
+    'csv': make_sdmx_csv,
+}
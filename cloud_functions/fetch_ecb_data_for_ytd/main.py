@@ -1,22 +1,101 @@
-from itertools import product
-import requests
-import pandas as pd
-from datetime import date, datetime
+import os
 
-from cloud_functions.utils.commons import fetch_ecb_data_for_ytd, transform_to_fact_table
+from cloud_functions.utils.backfill import fetch_ecb_backfill, plan_date_chunks
+from cloud_functions.utils.commons import (
+    fetch_ecb_data_for_ytd,
+    get_pair_rules,
+    transform_in_date_blocks,
+    transform_to_base_rate_table,
+    transform_to_fact_table,
+)
+from cloud_functions.utils.cross_rates import get_fact_model
+from cloud_functions.utils.pipeline import run_pipelined
 
-def etl_fx_function(start_date, end_date):
+EXTRACTION_ENGINES = ('threads', 'async')
+
+def _get_extraction_engine(engine):
+    # httpx y asyncio solo se cargan si se usa el motor asíncrono.
+    if engine == 'async':
+        from cloud_functions.utils.async_client import fetch_ecb_backfill_async
+        return fetch_ecb_backfill_async
+    return fetch_ecb_backfill
+
+def etl_fx_function(start_date, end_date, chunk=None, engine=None, conditional=False, block_days=None):
     """
     Main ETL function to extract, transform FX data from ECB for given date range.
+    Long ranges are fetched as concurrent year/month chunks, either with a thread
+    pool ('threads') or from one asyncio event loop ('async'). The engine defaults
+    to the ECB_EXTRACTION_ENGINE env var, or 'threads'. With `conditional`, the
+    ECB is asked only for data published since the last committed run, and
+    None is returned when nothing new is available.
+    With FX_FACT_MODEL=compact only the EUR/X base rates are returned, and
+    with FX_FACT_MODEL=triangular only the pairs with base < quote (the other
+    pairs are derived by a view in the destination). FX_PAIRS restricts the
+    generated pairs to a whitelist (see commons.get_pair_rules).
+    With `block_days`, an iterator of fact DataFrames of at most `block_days`
+    exchange dates each is returned instead of one DataFrame; every block is
+    transformed only when the caller asks for it (see commons.transform_in_date_blocks).
     """
+    engine = engine or os.getenv("ECB_EXTRACTION_ENGINE", "threads")
+    if engine not in EXTRACTION_ENGINES:
+        raise ValueError(f"Motor de extracción no soportado: {engine}. Usa uno de {EXTRACTION_ENGINES}.")
+    fact_model = get_fact_model()
+    pairs = get_pair_rules()
 
-    result_e = fetch_ecb_data_for_ytd(start_date, end_date)
-    
-    if isinstance(result_e, tuple):
+    result_e = _get_extraction_engine(engine)(start_date, end_date, chunk=chunk, conditional=conditional)
+
+    if result_e is None or isinstance(result_e, tuple):
         return result_e
 
-    df_base_rates = result_e
+    return transform_base_rates(result_e, fact_model=fact_model, pairs=pairs, block_days=block_days)
+
+def transform_base_rates(df_base_rates, fact_model=None, pairs=None, block_days=None):
+    """
+    Transform extracted base rates into the rows stored by the FX_FACT_MODEL
+    fact model: a fact DataFrame, or an iterator of fact DataFrames of at
+    most `block_days` exchange dates each when `block_days` is given.
+    `fact_model` and `pairs` default to get_fact_model() and get_pair_rules().
+    """
+    fact_model = fact_model or get_fact_model()
+    if fact_model == 'compact':
+        transform, transform_kwargs = transform_to_base_rate_table, {}
+    else:
+        transform = transform_to_fact_table
+        transform_kwargs = {'upper_triangular': fact_model == 'triangular', 'pairs': pairs or get_pair_rules()}
+
+    if block_days:
+        return transform_in_date_blocks(df_base_rates, block_days, transform, **transform_kwargs)
 
-    df_fact = transform_to_fact_table(df_base_rates)
+    df_fact = transform(df_base_rates, **transform_kwargs)
 
     return df_fact
+
+def etl_fx_pipelined(ranges, load, chunk=None, block_days=None, queue_size=None):
+    """
+    Pipelined ETL for backfills: every range is split into year/month windows
+    (see backfill.plan_date_chunks) that flow through extract, transform and
+    load concurrently, one window per stage, so the backfill takes about as
+    long as its slowest stage instead of the sum of the three. Windows are
+    downloaded one at a time with the threads client; the overlap between
+    stages replaces the concurrent requests of the extraction engines.
+
+    Args:
+        ranges: (start_date, end_date) tuples to load.
+        load: Called with every non-empty fact DataFrame; returns a load result dict.
+        chunk: 'year' or 'month'. Defaults to ECB_BACKFILL_CHUNK, or 'year'.
+        block_days: Transform every window in blocks of at most this many exchange dates.
+        queue_size: Capacity of the queues between stages (see pipeline.run_pipelined).
+    Returns:
+        A (load_results, error) tuple (see pipeline.run_pipelined).
+    """
+    chunk = chunk or os.getenv("ECB_BACKFILL_CHUNK", "year")
+    fact_model = get_fact_model()
+    pairs = get_pair_rules()
+    windows = [window for start_date, end_date in ranges for window in plan_date_chunks(start_date, end_date, chunk)]
+
+    def transform(df_base_rates):
+        df_fact = transform_base_rates(df_base_rates, fact_model=fact_model, pairs=pairs, block_days=block_days)
+        return df_fact if block_days else [df_fact]
+
+    print(f"ETL en pipeline de {len(windows)} bloques ({chunk})...")
+    return run_pipelined(windows, fetch_ecb_data_for_ytd, transform, load, queue_size=queue_size)
@@ -0,0 +1,178 @@
+import asyncio
+import io
+import os
+import random
+from datetime import datetime, timezone
+
+import httpx
+import ijson
+import pandas as pd
+
+from cloud_functions.utils.backfill import plan_date_chunks
+from cloud_functions.utils.commons import (
+    BASE_CURRENCY,
+    ECB_DATA_FORMATS,
+    add_base_currency_rows,
+    build_ecb_url,
+    get_target_currencies,
+    parse_ecb_payload,
+)
+from cloud_functions.utils.ecb_state import (
+    build_conditional_request,
+    is_no_data_response,
+    remember_ecb_response,
+)
+from cloud_functions.utils.http_client import ECB_TIMEOUT, RETRY_STATUS_CODES
+from cloud_functions.utils.instrumentation import instrumented_stage, record_stage_metrics
+from cloud_functions.utils.response_cache import get_response_cache, ttl_for_window
+
+ECB_REQUEST_DEADLINE = float(os.getenv("ECB_REQUEST_DEADLINE", "120"))
+
+
+def plan_ecb_requests(start_date: str, end_date: str, chunk: str = 'year', split_series: bool = False) -> list[tuple]:
+    """
+    Plan the (currencies, start_date, end_date) requests needed for a date range.
+
+    Args:
+        start_date: Start date in 'YYYY-MM-DD' format.
+        end_date: End date in 'YYYY-MM-DD' format.
+        chunk: 'year' or 'month' date windows.
+        split_series: If True, request each currency series separately. Ignored
+            with the FX_CURRENCIES="*" wildcard, whose series are not known upfront.
+    Returns:
+        A list of (currencies, start_date, end_date) tuples; currencies is
+        None for the wildcard.
+    """
+    currencies = get_target_currencies()
+    if currencies is None:
+        series_groups = [None]
+    else:
+        quoted = [c for c in currencies if c != BASE_CURRENCY]
+        series_groups = [[c] for c in quoted] if split_series else [quoted]
+    return [
+        (currencies, window_start, window_end)
+        for window_start, window_end in plan_date_chunks(start_date, end_date, chunk)
+        for currencies in series_groups
+    ]
+
+
+async def _fetch_one(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str, start_date: str,
+                     end_date: str, data_format: str, deadline: float, max_retries: int, conditional: bool):
+    headers = {'Accept': ECB_DATA_FORMATS[data_format]}
+    request_url, conditional_headers = build_conditional_request(url) if conditional else (url, {})
+    headers.update(conditional_headers)
+    sent_validators = request_url != url or bool(conditional_headers)
+
+    cache = None if conditional else get_response_cache()
+    cached_payload = cache.open(url) if cache is not None else None
+    if cached_payload is not None:
+        with cached_payload:
+            return await asyncio.to_thread(parse_ecb_payload, cached_payload, data_format)
+
+    async with semaphore:
+        async with asyncio.timeout(deadline):
+            requested_at = datetime.now(timezone.utc)
+            for attempt in range(max_retries + 1):
+                response = await client.get(request_url, headers=headers)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+                    break
+                # Backoff exponencial con jitter, igual que la sesión síncrona.
+                await asyncio.sleep(min(0.5 * 2 ** attempt, 30) + random.uniform(0, 0.5))
+            if is_no_data_response(response.status_code, sent_validators, start_date, end_date):
+                return None
+            response.raise_for_status()
+            payload = response.content
+            record_stage_metrics(bytes_downloaded=response.num_bytes_downloaded)
+
+    df_rates = await asyncio.to_thread(parse_ecb_payload, io.BytesIO(payload), data_format)
+    if cache is not None:
+        cache.store(url, payload, ttl_for_window(end_date))
+    if conditional and not df_rates.empty:
+        remember_ecb_response(url, response.headers, requested_at, str(df_rates['exchange_date'].max()))
+    return df_rates
+
+
+async def fetch_ecb_requests_async(requests_plan: list[tuple], data_format: str = None,
+                                   max_concurrency: int = None, deadline: float = None,
+                                   conditional: bool = False, base_url: str = None):
+    """
+    Fetch many (currencies, date-window) ECB requests concurrently from one event loop.
+
+    Concurrency is capped with an asyncio.Semaphore and every request has its
+    own deadline (including retries on 429/5xx).
+
+    Args:
+        requests_plan: List of (currencies, start_date, end_date) tuples.
+        data_format: 'json' or 'csv'. Defaults to the ECB_DATA_FORMAT env var, or 'json'.
+        max_concurrency: Maximum in-flight requests. Defaults to ECB_ASYNC_CONCURRENCY, or 8.
+        deadline: Seconds allowed per request. Defaults to ECB_REQUEST_DEADLINE, or 120.
+        conditional: Send conditional requests (see fetch_ecb_data_for_ytd).
+        base_url: Data API root (see build_ecb_url).
+    Returns:
+        A pandas DataFrame with the base rates in date order, None if no request
+        returned new data, or an error tuple.
+    """
+    data_format = data_format or os.getenv("ECB_DATA_FORMAT", "json")
+    max_concurrency = max_concurrency or int(os.getenv("ECB_ASYNC_CONCURRENCY", "8"))
+    deadline = deadline or ECB_REQUEST_DEADLINE
+    max_retries = int(os.getenv("ECB_MAX_RETRIES", "5"))
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    timeout = httpx.Timeout(ECB_TIMEOUT[1], connect=ECB_TIMEOUT[0])
+    limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+
+    print(f"Lanzando {len(requests_plan)} peticiones al BCE (concurrencia máxima {max_concurrency})...")
+
+    try:
+        async with httpx.AsyncClient(timeout=timeout, limits=limits,
+                                     headers={'Accept-Encoding': 'gzip, deflate'}) as client:
+            results = await asyncio.gather(*(
+                _fetch_one(
+                    client, semaphore, build_ecb_url(start, end, data_format, currencies, base_url), start, end,
+                    data_format, deadline, max_retries, conditional
+                )
+                for currencies, start, end in requests_plan
+            ))
+    except (httpx.HTTPError, TimeoutError) as e:
+        error_msg = f"Error al acceder a la API del BCE: {e!r}"
+        print(error_msg)
+        return {"status": "error", "message": error_msg}, 500
+    except (KeyError, IndexError, ValueError, ijson.JSONError) as e:
+        error_msg = f"Error al procesar la respuesta SDMX del BCE: {e}"
+        print(error_msg)
+        return {"status": "error", "message": error_msg}, 500
+
+    results = [result for result in results if result is not None]
+    if not results:
+        print("Sin datos nuevos del BCE para el periodo.")
+        return None
+
+    df_rates = pd.concat(results, ignore_index=True)
+    df = add_base_currency_rows(df_rates).sort_values('exchange_date', kind='stable', ignore_index=True)
+
+    print(f"Extracción asíncrona completada. Filas encontradas: {len(df)}")
+    return df
+
+
+@instrumented_stage('extract')
+def fetch_ecb_backfill_async(start_date: str, end_date: str, chunk: str = None, split_series: bool = None,
+                             conditional: bool = False):
+    """
+    Synchronous entry point for the asyncio extraction engine.
+
+    Args:
+        start_date: Start date in 'YYYY-MM-DD' format.
+        end_date: End date in 'YYYY-MM-DD' format.
+        chunk: 'year' or 'month'. Defaults to the ECB_BACKFILL_CHUNK env var, or 'year'.
+        split_series: Request each currency separately. Defaults to ECB_ASYNC_SPLIT_SERIES.
+        conditional: Send conditional requests (see fetch_ecb_data_for_ytd).
+    Returns:
+        A pandas DataFrame with the base rates in date order, None if there is
+        no new data, or an error tuple.
+    """
+    chunk = chunk or os.getenv("ECB_BACKFILL_CHUNK", "year")
+    if split_series is None:
+        split_series = os.getenv("ECB_ASYNC_SPLIT_SERIES", "false").lower() == "true"
+
+    requests_plan = plan_ecb_requests(start_date, end_date, chunk, split_series)
+    return asyncio.run(fetch_ecb_requests_async(requests_plan, conditional=conditional))
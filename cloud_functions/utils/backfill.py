@@ -0,0 +1,93 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from cloud_functions.utils.commons import fetch_ecb_data_for_ytd
+
+BACKFILL_CHUNKS = ('year', 'month')
+
+
+def _next_chunk_start(current: date, chunk: str) -> date:
+    if chunk == 'year':
+        return date(current.year + 1, 1, 1)
+    if current.month == 12:
+        return date(current.year + 1, 1, 1)
+    return date(current.year, current.month + 1, 1)
+
+
+def plan_date_chunks(start_date: str, end_date: str, chunk: str = 'year') -> list[tuple[str, str]]:
+    """
+    Split a [start_date, end_date] range into calendar year or month windows.
+
+    Args:
+        start_date: Start date in 'YYYY-MM-DD' format.
+        end_date: End date in 'YYYY-MM-DD' format (inclusive).
+        chunk: 'year' or 'month'.
+    Returns:
+        A list of (start_date, end_date) tuples in chronological order.
+    """
+    if chunk not in BACKFILL_CHUNKS:
+        raise ValueError(f"Tamaño de bloque no soportado: {chunk}. Usa uno de {BACKFILL_CHUNKS}.")
+
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    if start > end:
+        raise ValueError(f"La fecha de inicio {start_date} es posterior a la fecha de fin {end_date}.")
+
+    chunks = []
+    current = start
+    while current <= end:
+        chunk_end = min(_next_chunk_start(current, chunk) - timedelta(days=1), end)
+        chunks.append((current.isoformat(), chunk_end.isoformat()))
+        current = chunk_end + timedelta(days=1)
+    return chunks
+
+
+def fetch_ecb_backfill(start_date: str, end_date: str, chunk: str = None, max_workers: int = None,
+                       conditional: bool = False):
+    """
+    Fetch an arbitrary date range from the ECB as concurrent chunked requests.
+
+    Args:
+        start_date: Start date in 'YYYY-MM-DD' format.
+        end_date: End date in 'YYYY-MM-DD' format.
+        chunk: 'year' or 'month'. Defaults to the ECB_BACKFILL_CHUNK env var, or 'year'.
+        max_workers: Size of the thread pool. Defaults to ECB_BACKFILL_WORKERS, or 4.
+        conditional: Send conditional requests (see fetch_ecb_data_for_ytd).
+    Returns:
+        A pandas DataFrame with the base rates in date order, None if no chunk
+        returned new data, or the error tuple returned by the first failing chunk.
+    """
+    chunk = chunk or os.getenv("ECB_BACKFILL_CHUNK", "year")
+    max_workers = max_workers or int(os.getenv("ECB_BACKFILL_WORKERS", "4"))
+
+    chunks = plan_date_chunks(start_date, end_date, chunk)
+    if len(chunks) == 1:
+        return fetch_ecb_data_for_ytd(*chunks[0], conditional=conditional)
+
+    print(f"Backfill de {start_date} a {end_date} en {len(chunks)} bloques ({chunk}) con {max_workers} hilos...")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Cada bloque corre en una copia del contexto para que sus métricas se recojan.
+        futures = [
+            executor.submit(contextvars.copy_context().run, fetch_ecb_data_for_ytd, *window, conditional=conditional)
+            for window in chunks
+        ]
+        results = [future.result() for future in futures]
+
+    for result in results:
+        if isinstance(result, tuple):
+            return result
+
+    results = [result for result in results if result is not None]
+    if not results:
+        return None
+
+    import pandas as pd
+
+    df = pd.concat(results, ignore_index=True)
+    df = df.sort_values('exchange_date', kind='stable', ignore_index=True)
+
+    print(f"Backfill completado. Filas encontradas: {len(df)}")
+    return df
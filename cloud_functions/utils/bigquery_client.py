@@ -0,0 +1,135 @@
+import threading
+import time
+from datetime import date
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+BIGQUERY_API_URL = "https://bigquery.googleapis.com/bigquery/v2"
+BIGQUERY_SCOPE = "https://www.googleapis.com/auth/bigquery"
+
+_clients = {}
+_clients_lock = threading.Lock()
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_bigquery_client(project_id: str) -> 'bigquery.Client':
+    """
+    Return the process-wide BigQuery client for `project_id`.
+
+    The client is created lazily on first use and kept for the lifetime of
+    the Cloud Function instance, so warm invocations skip credential
+    discovery and transport setup. Client methods are safe to call from
+    concurrent requests.
+
+    Args:
+        project_id: GCP project ID.
+    Returns:
+        A bigquery.Client bound to the project.
+    """
+    client = _clients.get(project_id)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(project_id)
+            if client is None:
+                from google.cloud import bigquery
+
+                client = _clients[project_id] = bigquery.Client(project=project_id)
+    return client
+
+
+def get_bigquery_session():
+    """
+    Return the process-wide AuthorizedSession for the BigQuery REST API.
+
+    It only needs google.auth and requests: unlike bigquery.Client, which
+    imports pandas, numpy and pyarrow, it keeps the watermark queries of a
+    daily run with nothing to load cheap to import.
+
+    Returns:
+        A google.auth.transport.requests.AuthorizedSession with the default credentials.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import google.auth
+                from google.auth.transport.requests import AuthorizedSession
+
+                credentials, _ = google.auth.default(scopes=[BIGQUERY_SCOPE])
+                _session = AuthorizedSession(credentials)
+    return _session
+
+
+def _query_parameter(name: str, parameter_type: str, value) -> dict:
+    if isinstance(value, (list, tuple, set)):
+        return {
+            'name': name,
+            'parameterType': {'type': 'ARRAY', 'arrayType': {'type': parameter_type}},
+            'parameterValue': {'arrayValues': [{'value': str(v)} for v in value]},
+        }
+    return {'name': name, 'parameterType': {'type': parameter_type}, 'parameterValue': {'value': str(value)}}
+
+
+def _cell_value(field: dict, value):
+    if value is None:
+        return None
+    if field.get('mode') == 'REPEATED':
+        return [_cell_value({**field, 'mode': 'NULLABLE'}, item['v']) for item in value]
+    if field['type'] in ('INTEGER', 'INT64'):
+        return int(value)
+    if field['type'] == 'DATE':
+        return date.fromisoformat(value)
+    return value
+
+
+def run_bigquery_query(project_id: str, query: str, query_parameters: list[tuple] = (),
+                       timeout_s: float = 60.0) -> list[dict]:
+    """
+    Run a GoogleSQL query through the jobs.query REST endpoint and return its rows.
+
+    Args:
+        project_id: GCP project ID that runs the query job.
+        query: GoogleSQL statement with named parameters.
+        query_parameters: (name, type, value) tuples; a list value is sent as ARRAY<type>.
+        timeout_s: Seconds to wait for the job to complete.
+    Returns:
+        One dict per row ({column: value}); INTEGER and DATE columns are
+        converted to int and datetime.date, repeated columns to lists.
+    """
+    session = get_bigquery_session()
+    deadline = time.monotonic() + timeout_s
+    response = session.post(f"{BIGQUERY_API_URL}/projects/{project_id}/queries", json={
+        'query': query,
+        'useLegacySql': False,
+        'parameterMode': 'NAMED',
+        'queryParameters': [_query_parameter(*parameter) for parameter in query_parameters],
+        'timeoutMs': int(timeout_s * 1000),
+    }, timeout=timeout_s)
+    response.raise_for_status()
+    result = response.json()
+    job = result['jobReference']
+
+    rows = []
+    while True:
+        if result.get('jobComplete'):
+            fields = result['schema']['fields']
+            rows.extend(
+                {field['name']: _cell_value(field, cell['v']) for field, cell in zip(fields, row['f'])}
+                for row in result.get('rows', [])
+            )
+            if not result.get('pageToken'):
+                return rows
+            params = {'pageToken': result['pageToken']}
+        elif time.monotonic() > deadline:
+            raise TimeoutError(f"La consulta {job['jobId']} de BigQuery no terminó en {timeout_s} s.")
+        else:
+            params = {}
+
+        params.update(location=job.get('location'), timeoutMs=int(max(deadline - time.monotonic(), 1) * 1000))
+        response = session.get(f"{BIGQUERY_API_URL}/projects/{project_id}/queries/{job['jobId']}",
+                               params=params, timeout=timeout_s)
+        response.raise_for_status()
+        result = response.json()
@@ -1,96 +1,412 @@
-from itertools import product
+from __future__ import annotations
+
 import os
+import ijson
 import requests
-import pandas as pd
-from datetime import date, datetime
-from google.cloud import bigquery
+from datetime import date, datetime, timezone
+from typing import TYPE_CHECKING
+
+from cloud_functions.utils.ecb_state import (
+    build_conditional_request,
+    is_no_data_response,
+    remember_ecb_response,
+)
+from cloud_functions.utils.http_client import ECB_TIMEOUT, get_ecb_session, open_response_stream
+from cloud_functions.utils.instrumentation import instrumented_stage, record_stage_metrics
+from cloud_functions.utils.response_cache import get_response_cache, ttl_for_window
+
+# pandas, numpy, pyarrow y google.cloud.bigquery se importan en la primera
+# función que los usa: una ejecución diaria sin datos nuevos no los carga.
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 # 🎯 Divisas objetivo (se usa EUR como base por defecto del BCE)
 TARGET_CURRENCIES = ['NOK', 'EUR', 'SEK', 'PLN', 'RON', 'DKK', 'CZK']
 BASE_CURRENCY = 'EUR' # El BCE siempre cotiza frente al EUR.
+ALL_CURRENCIES = '*' # FX_CURRENCIES="*": todas las divisas del BCE (clave D..EUR.SP00.A).
+
+ECB_DATA_FORMATS = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+}
+ECB_API_BASE_URL = "https://data-api.ecb.europa.eu/service/data"
 
-def fetch_ecb_data_for_ytd(start_date: str, end_date: str):
+def get_target_currencies() -> list[str] | None:
     """
-    Function that extracts ECB exchange rates for a YTD time period.
+    Return the currency universe configured in FX_CURRENCIES.
+
+    FX_CURRENCIES is a comma-separated list of ISO codes (e.g. "EUR,USD,GBP")
+    or "*" for every currency the ECB quotes. Unset, TARGET_CURRENCIES is used.
+
+    Returns:
+        The currencies in configuration order, or None for the wildcard.
+    """
+    value = os.getenv("FX_CURRENCIES", "").strip()
+    if not value:
+        return TARGET_CURRENCIES
+    if value == ALL_CURRENCIES:
+        return None
+
+    currencies = list(dict.fromkeys(c.strip().upper() for c in value.split(',') if c.strip()))
+    invalid = [c for c in currencies if len(c) != 3 or not c.isalpha()]
+    if invalid:
+        raise ValueError(f"Códigos de divisa no válidos en FX_CURRENCIES: {invalid}")
+    if not [c for c in currencies if c != BASE_CURRENCY]:
+        raise ValueError(f"FX_CURRENCIES debe incluir al menos una divisa distinta de {BASE_CURRENCY}.")
+    return currencies
+
+def get_pair_rules() -> list[tuple[str, str]] | None:
+    """
+    Return the requested-pair rules configured in FX_PAIRS.
+
+    FX_PAIRS is a comma-separated list of BASE/QUOTE pairs where either side
+    may be "*": "NOK/SEK,EUR/USD" requests two pairs, "USD/*" every pair
+    against the USD base and "*/EUR" every pair quoted in EUR. Unset, every
+    pair of the currency universe is generated. Every named currency must be
+    part of the universe (see get_target_currencies); otherwise its rule
+    would silently select no pair.
+
+    Returns:
+        The (base, quote) rules, or None for every pair.
+    """
+    value = os.getenv("FX_PAIRS", "").strip()
+    if not value:
+        return None
+
+    rules = []
+    for rule in (r.strip().upper() for r in value.split(',') if r.strip()):
+        sides = rule.split('/')
+        if len(sides) != 2 or not all(side == ALL_CURRENCIES or (len(side) == 3 and side.isalpha()) for side in sides):
+            raise ValueError(f"Par no válido en FX_PAIRS: {rule}. Usa BASE/QUOTE, p. ej. NOK/SEK o USD/*.")
+        rules.append((sides[0], sides[1]))
+
+    universe = get_target_currencies()
+    if universe is not None:
+        unknown = sorted({c for rule in rules for c in rule if c != ALL_CURRENCIES} - set(universe))
+        if unknown:
+            raise ValueError(
+                f"FX_PAIRS usa divisas fuera del universo ({', '.join(universe)}): {unknown}. "
+                "Añádelas a FX_CURRENCIES."
+            )
+    return list(dict.fromkeys(rules))
+
+def get_stored_currencies(fact_model: str) -> set[str] | None:
+    """
+    Return the currencies that every loaded exchange date is expected to
+    hold (as base or quote) with the configured universe and pairs.
+
+    Args:
+        fact_model: Fact model (see cross_rates.get_fact_model); FX_PAIRS
+            does not apply to the compact model.
+    Returns:
+        The set of currencies, or None for the "*" universe.
+    """
+    universe = get_target_currencies()
+    if universe is None:
+        return None
+    rules = get_pair_rules()
+    if fact_model == 'compact' or rules is None or any(ALL_CURRENCIES in rule for rule in rules):
+        return set(universe)
+    return {c for rule in rules for c in rule}
+
+def count_stored_pairs(fact_model: str) -> int | None:
+    """
+    Return the rows stored per exchange date when every configured currency
+    is quoted, as generated by transform_to_fact_table / select_pairs (or
+    transform_to_base_rate_table for the compact model).
+
+    Args:
+        fact_model: Fact model (see cross_rates.get_fact_model).
+    Returns:
+        The number of rows, or None for the "*" universe.
+    """
+    universe = get_target_currencies()
+    if universe is None:
+        return None
+    if fact_model == 'compact':
+        return len(universe)
+
+    rules = get_pair_rules()
+    pairs = {
+        (base, quote) for base in universe for quote in universe
+        if rules is None or any(rule_base in (ALL_CURRENCIES, base) and rule_quote in (ALL_CURRENCIES, quote)
+                                for rule_base, rule_quote in rules)
+    }
+    if fact_model == 'triangular':
+        pairs = {(min(pair), max(pair)) for pair in pairs if pair[0] != pair[1]}
+    return len(pairs)
+
+def build_ecb_url(start_date: str, end_date: str, data_format: str = 'json', currencies: list = None,
+                  base_url: str = None) -> str:
+    """
+    Build the ECB data API URL for the target currencies and date range.
 
     Args:
         start_date: Start date in 'YYYY-MM-DD' format.
         end_date: End date in 'YYYY-MM-DD' format.
+        data_format: 'json' (SDMX-JSON) or 'csv' (SDMX-CSV).
+        currencies: Currencies to request. Defaults to get_target_currencies();
+            with the FX_CURRENCIES="*" wildcard the currency dimension is left
+            empty (D..EUR.SP00.A) and every ECB currency is returned.
+        base_url: Data API root. Defaults to the ECB_API_BASE_URL env var, or the
+            public ECB endpoint (override it to target a local stand-in server).
     Returns:
-        A pandas DataFrame with the extracted data or an error message.
+        The request URL.
     """
-    currencies_str = "+".join(c for c in TARGET_CURRENCIES if c != BASE_CURRENCY)
-    
-    ECB_API_URL = (
-        "https://data-api.ecb.europa.eu/service/data/EXR/D."
+    currencies = get_target_currencies() if currencies is None else currencies
+    currencies_str = "+".join(c for c in currencies or [] if c != BASE_CURRENCY)
+    base_url = (base_url or os.getenv("ECB_API_BASE_URL", ECB_API_BASE_URL)).rstrip('/')
+
+    url = (
+        f"{base_url}/EXR/D."
         f"{currencies_str}.{BASE_CURRENCY}.SP00.A?startPeriod={start_date}&endPeriod={end_date}"
     )
-    headers = {'Accept': 'application/json'}
+    if data_format == 'csv':
+        url += "&format=csvdata"
+    return url
+
+def parse_ecb_payload(payload, data_format: str) -> pd.DataFrame:
+    """
+    Parse an ECB SDMX payload (JSON or CSV) into EUR/X base rates.
+
+    Args:
+        payload: File-like object returning the raw response bytes.
+        data_format: 'json' or 'csv'.
+    Returns:
+        A pandas DataFrame with exchange_date, base_currency, quote_currency and rate.
+    """
+    from cloud_functions.utils.sdmx import parse_sdmx_csv, parse_sdmx_json
+
+    if data_format == 'csv':
+        return parse_sdmx_csv(payload, BASE_CURRENCY)
+    return parse_sdmx_json(payload, BASE_CURRENCY)
+
+def add_base_currency_rows(df_rates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append the EUR/EUR identity rate (1.0) for every date in the base rates.
+
+    Args:
+        df_rates: DataFrame with the EUR/X rates returned by the ECB.
+    Returns:
+        The base rates including one EUR/EUR row per date.
+    """
+    import pandas as pd
+
+    dates_fetched = df_rates['exchange_date'].unique()
+    df_base = pd.DataFrame({
+        'exchange_date': dates_fetched,
+        'base_currency': BASE_CURRENCY,
+        'quote_currency': BASE_CURRENCY,
+        'rate': 1.0
+    })
+
+    return pd.concat([df_rates, df_base], ignore_index=True)
+
+@instrumented_stage('extract')
+def fetch_ecb_data_for_ytd(start_date: str, end_date: str, data_format: str = None, conditional: bool = False,
+                          base_url: str = None):
+    """
+    Function that extracts ECB exchange rates for a YTD time period.
+
+    Args:
+        start_date: Start date in 'YYYY-MM-DD' format.
+        end_date: End date in 'YYYY-MM-DD' format.
+        data_format: 'json' or 'csv'. Defaults to the ECB_DATA_FORMAT env var, or 'json'.
+        conditional: Send the ETag/Last-Modified/updatedAfter validators of the
+            last committed response when they apply to the window (see
+            ecb_state.build_conditional_request).
+        base_url: Data API root (see build_ecb_url).
+    Returns:
+        A pandas DataFrame with the extracted data, None if the ECB has no
+        (new) data for the period, or an error message.
+    """
+    data_format = data_format or os.getenv("ECB_DATA_FORMAT", "json")
+    if data_format not in ECB_DATA_FORMATS:
+        raise ValueError(f"Formato de datos del BCE no soportado: {data_format}")
+
+    ECB_API_URL = build_ecb_url(start_date, end_date, data_format, base_url=base_url)
+    headers = {'Accept': ECB_DATA_FORMATS[data_format]}
+    request_url, conditional_headers = build_conditional_request(ECB_API_URL) if conditional else (ECB_API_URL, {})
+    headers.update(conditional_headers)
+    # Solo una petición con validadores puede recibir 404 por "nada nuevo".
+    sent_validators = request_url != ECB_API_URL or bool(conditional_headers)
 
     print(f"Buscando datos desde {start_date} hasta {end_date}...")
-    print(f"URL de la API: {ECB_API_URL}")
 
-    try:
-        response = requests.get(ECB_API_URL, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-    except requests.exceptions.RequestException as e:
-        error_msg = f"Error al acceder a la API del BCE: {e}"
-        print(error_msg)
-        return {"status": "error", "message": error_msg}, 500
+    # Las peticiones condicionales siempre van al BCE; el resto se leen a través de la caché.
+    cache = None if conditional else get_response_cache()
+    payload = cache.open(ECB_API_URL) if cache is not None else None
+    response = None
+
+    if payload is not None:
+        print(f"Respuesta servida desde la caché local: {ECB_API_URL}")
+    else:
+        print(f"URL de la API: {request_url}")
+
+        try:
+            requested_at = datetime.now(timezone.utc)
+            response = get_ecb_session().get(
+                request_url, headers=headers, stream=True, timeout=ECB_TIMEOUT
+            )
+            if is_no_data_response(response.status_code, sent_validators, start_date, end_date):
+                response.close()
+                print(f"Sin datos nuevos del BCE para el periodo (HTTP {response.status_code}).")
+                return None
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            # Respuesta en streaming: se cierra para devolver la conexión al pool.
+            if response is not None:
+                response.close()
+            error_msg = f"Error al acceder a la API del BCE: {e}"
+            print(error_msg)
+            return {"status": "error", "message": error_msg}, 500
+
+        payload = open_response_stream(response)
+        if cache is not None:
+            payload = cache.record(ECB_API_URL, payload, ttl_for_window(end_date))
 
     try:
-        series_data = data['dataSets'][0]['series']
-        
-        normalized_data = []
-
-        for series_key, series_info in series_data.items():
-            quote_currency = data['structure']['dimensions']['series'][1]['values'][series_info['attributes'][-4]]['id']
-            
-            for observation_key, observation_value in series_info['observations'].items():
-                
-                time_index = int(observation_key.split(':')[0])
-                exchange_date = data['structure']['dimensions']['observation'][0]['values'][time_index]['id']
-                
-                rate = observation_value[0]
-                
-                normalized_data.append({
-                    'exchange_date': exchange_date,
-                    'base_currency': BASE_CURRENCY,
-                    'quote_currency': quote_currency,
-                    'rate': float(rate)
-                })
-
-        dates_fetched = set(d['exchange_date'] for d in normalized_data)
-        for d in dates_fetched:
-            normalized_data.append({
-                'exchange_date': d,
-                'base_currency': BASE_CURRENCY,
-                'quote_currency': BASE_CURRENCY,
-                'rate': 1.0
-            })
-            
-        df = pd.DataFrame(normalized_data)
+        df = add_base_currency_rows(parse_ecb_payload(payload, data_format))
+
+        if cache is not None and response is not None:
+            payload.commit()
+
+        # Bytes recibidos por la red (comprimidos); 0 si se sirvió desde la caché.
+        record_stage_metrics(bytes_downloaded=response.raw.tell() if response is not None else 0,
+                             cache_hit=response is None)
+
+        if conditional and not df.empty:
+            remember_ecb_response(ECB_API_URL, response.headers, requested_at, str(df['exchange_date'].max()))
         
         print(f"Extracción exitosa. Filas encontradas: {len(df)}")
         
         return df
 
-    except (KeyError, IndexError, ValueError) as e:
-        error_msg = f"Error al procesar el JSON SDMX del BCE: {e}"
+    except requests.exceptions.RequestException as e:
+        error_msg = f"Error al descargar la respuesta del BCE: {e}"
+        print(error_msg)
+        return {"status": "error", "message": error_msg}, 500
+
+    except (KeyError, IndexError, ValueError, ijson.JSONError) as e:
+        error_msg = f"Error al procesar la respuesta SDMX del BCE: {e}"
         print(error_msg)
         return {"status": "error", "message": error_msg}, 500
 
+    finally:
+        payload.close()
+        if response is not None:
+            response.close()
+
+
+def _divide_rates(quote: np.ndarray, base: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # quote / base y su inverso escritos directamente en los arrays de salida,
+    # sin los temporales de np.where (0.0 donde el divisor es 0).
+    import numpy as np
 
-def transform_to_fact_table(df_base_rates: pd.DataFrame) -> pd.DataFrame:
+    shape = np.broadcast_shapes(quote.shape, base.shape)
+    rate = np.zeros(shape)
+    np.divide(quote, base, out=rate, where=base != 0)
+    rate_inverse = np.zeros(shape)
+    np.divide(1.0, rate, out=rate_inverse, where=rate != 0)
+    return rate, rate_inverse
+
+
+def build_cross_rate_cube(base_rates: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute every cross rate for a dates x currencies matrix of EUR/X rates.
+
+    Args:
+        base_rates: 2D array where base_rates[d, i] is the EUR/currency_i rate on date d.
+    Returns:
+        A tuple (rate, rate_inverse) of dates x N x N arrays, where rate[d, b, q]
+        is the base_b/quote_q rate. Zero base rates yield 0.0, as do zero rates
+        when inverted.
+    """
+    import numpy as np
+
+    return _divide_rates(base_rates[:, np.newaxis, :], base_rates[:, :, np.newaxis])
+
+
+def build_pair_rates(base_rates: np.ndarray, base_index: np.ndarray, quote_index: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute only the selected cross rates, with the same zero handling as
+    build_cross_rate_cube but without materializing the N x N cube.
+
+    Args:
+        base_rates: 2D array where base_rates[d, i] is the EUR/currency_i rate on date d.
+        base_index: Currency index of the base of each pair.
+        quote_index: Currency index of the quote of each pair.
+    Returns:
+        A tuple (rate, rate_inverse) of dates x pairs arrays.
+    """
+    return _divide_rates(base_rates[:, quote_index], base_rates[:, base_index])
+
+
+def _universe(df_base_rates: pd.DataFrame) -> list[str]:
+    # Universo configurado, o todas las divisas recibidas con el comodín "*".
+    currencies = get_target_currencies()
+    if currencies is None:
+        currencies = sorted(df_base_rates['quote_currency'].unique())
+    return currencies
+
+def select_pairs(currencies: np.ndarray, pairs: list[tuple[str, str]] = None,
+                 upper_triangular: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Indices of the (base, quote) pairs to generate, in base-major order.
+
+    Args:
+        currencies: The currency universe.
+        pairs: (base, quote) rules as returned by get_pair_rules ("*" matches
+            any currency). None selects every pair.
+        upper_triangular: Keep only the pairs with base < quote; a requested
+            pair with base > quote selects its mirror, which the triangular
+            view turns back into the requested pair.
+    Returns:
+        A tuple (base_index, quote_index) of positions in `currencies`.
+    """
+    import numpy as np
+
+    n_currencies = len(currencies)
+    if pairs is None:
+        mask = np.ones((n_currencies, n_currencies), dtype=bool)
+    else:
+        mask = np.zeros((n_currencies, n_currencies), dtype=bool)
+        for base, quote in pairs:
+            is_base = np.ones(n_currencies, dtype=bool) if base == ALL_CURRENCIES else currencies == base
+            is_quote = np.ones(n_currencies, dtype=bool) if quote == ALL_CURRENCIES else currencies == quote
+            mask |= is_base[:, np.newaxis] & is_quote[np.newaxis, :]
+
+    if upper_triangular:
+        # Un par pedido en cualquier sentido se guarda en su orientación base < quote.
+        mask = (mask | mask.T) & (currencies[:, np.newaxis] < currencies[np.newaxis, :])
+    return np.nonzero(mask)
+
+@instrumented_stage('transform')
+def transform_to_fact_table(df_base_rates: pd.DataFrame, upper_triangular: bool = False,
+                            pairs: list[tuple[str, str]] = None) -> pd.DataFrame:
     """
     Make the transformation to create all cross currency pairs from base rates.
+
+    The pairs are generated for the configured universe (get_target_currencies)
+    with vectorized index arithmetic. Every non-rate column is a categorical
+    (a 1-4 byte code per row instead of one Python string per row), and
+    pairs without a rate on a date (a currency not fixed that day, or not
+    quoted any more) are left out.
     Args:
         df_base_rates: DataFrame with base rates (EUR/X).
+        upper_triangular: Emit only the pairs with base_currency < quote_currency.
+            The mirrored pair is the stored row with rate / rate_inverse swapped
+            and identity pairs have rate 1 (see cross_rates.build_triangular_view_sql).
+        pairs: Generate only these (base, quote) pairs (see get_pair_rules);
+            only their columns are gathered from the base rates, so the cost
+            scales with the requested pairs instead of N². None generates every pair.
     Returns:
         DataFrame transformed to the fact_exchange_rates structure.
     """
-    
+    import numpy as np
+    import pandas as pd
+
     if df_base_rates.empty:
         print("El DataFrame de entrada está vacío. No se realiza ninguna transformación.")
         return pd.DataFrame()
@@ -104,81 +420,204 @@ def transform_to_fact_table(df_base_rates: pd.DataFrame) -> pd.DataFrame:
     if BASE_CURRENCY not in df_pivot.columns:
          raise ValueError("La divisa base (EUR) no se encuentra en el DataFrame pivotado.")
 
-    final_records = []
-    
-    currency_pairs = list(product(TARGET_CURRENCIES, TARGET_CURRENCIES))
-
-    for index, row in df_pivot.iterrows():
-        exchange_date = row['exchange_date']
-        
-        for base, quote in currency_pairs:
-            
-            rate_eur_vs_base = row[base] 
-            rate_eur_vs_quote = row[quote]
-
-            if rate_eur_vs_base == 0:
-                 rate = 0.0
-            else:
-                 rate = rate_eur_vs_quote / rate_eur_vs_base
-                 
-            rate_inverse = 1.0 / rate if rate != 0 else 0.0
-
-            final_records.append({
-                'exchange_date': exchange_date,
-                'base_currency': base,
-                'quote_currency': quote,
-                'rate': rate,
-                'rate_inverse': rate_inverse,
-                'data_source': 'ECB',
-                'load_timestamp': datetime.now().isoformat(sep=' ', timespec='seconds')
-            })
-
-    df_final = pd.DataFrame(final_records)
-    
-    df_final['rate'] = df_final['rate'].astype(float)
-    df_final['rate_inverse'] = df_final['rate_inverse'].astype(float)
+    currencies = np.asarray(_universe(df_base_rates), dtype=object)
+    n_currencies = len(currencies)
+    n_dates = len(df_pivot)
+
+    # Divisas configuradas sin datos en el periodo quedan como NaN y se descartan abajo.
+    base_rates = df_pivot.reindex(columns=currencies).to_numpy(dtype=float)
+
+    if upper_triangular or pairs is not None:
+        base_index, quote_index = select_pairs(currencies, pairs, upper_triangular)
+        rate, rate_inverse = build_pair_rates(base_rates, base_index, quote_index)
+    else:
+        base_index = np.repeat(np.arange(n_currencies), n_currencies)
+        quote_index = np.tile(np.arange(n_currencies), n_currencies)
+        rate, rate_inverse = build_cross_rate_cube(base_rates)
+    n_pairs = len(base_index)
+    n_rows = n_dates * n_pairs
+
+    rate = rate.reshape(-1)
+    rate_inverse = rate_inverse.reshape(-1)
+    date_codes = np.repeat(np.arange(n_dates, dtype=np.int32), n_pairs)
+    base_codes = np.tile(base_index.astype(np.int16), n_dates)
+    quote_codes = np.tile(quote_index.astype(np.int16), n_dates)
+
+    present = ~np.isnan(rate)
+    if not present.all():
+        rate, rate_inverse, date_codes = rate[present], rate_inverse[present], date_codes[present]
+        base_codes, quote_codes = base_codes[present], quote_codes[present]
+        n_rows = len(rate)
+
+    currency_type = pd.CategoricalDtype(currencies)
+    df_final = pd.DataFrame({
+        # Las fechas del pivot están ordenadas: los códigos conservan el orden cronológico.
+        'exchange_date': pd.Categorical.from_codes(date_codes, categories=df_pivot['exchange_date'], ordered=True),
+        'base_currency': pd.Categorical.from_codes(base_codes, dtype=currency_type),
+        'quote_currency': pd.Categorical.from_codes(quote_codes, dtype=currency_type),
+        'rate': rate,
+        'rate_inverse': rate_inverse,
+        'data_source': pd.Categorical.from_codes(np.zeros(n_rows, dtype=np.int8), categories=['ECB']),
+        'load_timestamp': pd.Categorical.from_codes(
+            np.zeros(n_rows, dtype=np.int8), categories=[datetime.now().isoformat(sep=' ', timespec='seconds')]
+        ),
+    }, copy=False)
 
     print(f"Transformación completa. Total de pares cruzados generados: {len(df_final)}")
     return df_final
 
-def load_to_bigquery(df_fact: pd.DataFrame, PROJECT_ID: str, BIGQUERY_TABLE_FULL_ID: str) -> dict:
+@instrumented_stage('transform')
+def transform_to_base_rate_table(df_base_rates: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shape the EUR/X base rates (EUR/EUR included) as fact rows for the compact
+    model: N rows per date instead of N², with the crosses derived by the
+    cross-rate view (see cross_rates.build_cross_rate_view_sql).
+    Args:
+        df_base_rates: DataFrame with base rates (EUR/X).
+    Returns:
+        DataFrame with the fact_exchange_rates columns and base_currency = EUR.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if df_base_rates.empty:
+        print("El DataFrame de entrada está vacío. No se realiza ninguna transformación.")
+        return pd.DataFrame()
+
+    df_rates = df_base_rates[df_base_rates['quote_currency'].isin(_universe(df_base_rates))]
+    rate = df_rates['rate'].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore'):
+        rate_inverse = np.where(rate == 0, 0.0, 1.0 / rate)
+
+    df_final = pd.DataFrame({
+        'exchange_date': df_rates['exchange_date'].to_numpy(),
+        'base_currency': BASE_CURRENCY,
+        'quote_currency': df_rates['quote_currency'].to_numpy(),
+        'rate': rate,
+        'rate_inverse': rate_inverse,
+        'data_source': 'ECB',
+        'load_timestamp': datetime.now().isoformat(sep=' ', timespec='seconds')
+    }).sort_values(['exchange_date', 'quote_currency'], ignore_index=True)
+
+    print(f"Transformación completa. Total de tipos base generados: {len(df_final)}")
+    return df_final
+
+def transform_in_date_blocks(df_base_rates: pd.DataFrame, block_days: int, transform=None, **transform_kwargs):
+    """
+    Transform the base rates in consecutive blocks of `block_days` exchange
+    dates, lazily: each block is pivoted and expanded only when the caller
+    asks for it, so a multi-decade backfill holds one block of fact rows
+    (block_days x pairs) at a time instead of days x N².
+
+    Args:
+        df_base_rates: DataFrame with base rates (EUR/X).
+        block_days: Exchange dates per block.
+        transform: Transform applied to each block. Defaults to transform_to_fact_table.
+        **transform_kwargs: Extra arguments for `transform` (e.g. pairs).
+    Yields:
+        One fact DataFrame per block, in exchange_date order.
+    """
+    import numpy as np
+
+    if block_days < 1:
+        raise ValueError(f"El tamaño de bloque debe ser al menos 1 día: {block_days}")
+    if df_base_rates.empty:
+        return
+
+    transform = transform or transform_to_fact_table
+    df_sorted = df_base_rates.sort_values('exchange_date', kind='stable', ignore_index=True)
+    dates = df_sorted['exchange_date'].to_numpy()
+    date_starts = np.flatnonzero(np.append(True, dates[1:] != dates[:-1]))
+    block_starts = date_starts[::block_days]
+    block_ends = np.append(block_starts[1:], len(dates))
+
+    for start, end in zip(block_starts, block_ends):
+        yield transform(df_sorted.iloc[start:end], **transform_kwargs)
+
+BIGQUERY_WRITE_MODES = ('append', 'merge', 'partition_overwrite')
+
+@instrumented_stage('load')
+def load_to_bigquery(df_fact: pd.DataFrame, PROJECT_ID: str, BIGQUERY_TABLE_FULL_ID: str, write_mode: str = None) -> dict:
     """
     Load final exchange rates DataFrame into BigQuery table,
     reading target configuration from environment variables.
 
+    `df_fact` is not modified: it is converted to an Arrow table with the
+    declared fact schema and loaded as an in-memory compressed Parquet file.
+
     Args:
         df_fact: pandas DataFrame with the fact_exchange_rates structure.
         PROJECT_ID: GCP project ID.
         BIGQUERY_TABLE_FULL_ID: BigQuery table ID.
+        write_mode: 'append' (WRITE_APPEND), 'merge' (idempotent upsert on the
+            natural key) or 'partition_overwrite' (WRITE_TRUNCATE per table$YYYYMMDD
+            partition, or one DELETE + INSERT transaction above
+            BIGQUERY_PARTITION_OVERWRITE_MAX_JOBS days). Defaults to the
+            BIGQUERY_WRITE_MODE env var, or 'append'.
 
     Returns:
         A dictionary with the status of the load operation.
     """
+    import pyarrow as pa
+    from google.cloud import bigquery
+
+    from cloud_functions.utils.bigquery_client import get_bigquery_client
+    from cloud_functions.utils.load_strategies import (
+        build_fact_arrow_table,
+        load_arrow_table,
+        merge_into_bigquery,
+        overwrite_partitions_in_bigquery,
+        parquet_load_job_config,
+    )
+
+    write_mode = write_mode or os.getenv("BIGQUERY_WRITE_MODE", "append")
+    if write_mode not in BIGQUERY_WRITE_MODES:
+        return {"status": "error", "message": f"Modo de escritura no soportado: {write_mode}"}
+
     if df_fact.empty:
         print("El DataFrame a cargar está vacío. Omitiendo la carga en BigQuery.")
         return {"status": "skipped", "message": "DataFrame is empty."}
 
     try:
-        client = bigquery.Client(project=PROJECT_ID) 
+        client = get_bigquery_client(PROJECT_ID)
     except Exception as e:
         error_msg = f"Error al inicializar el cliente de BigQuery: {e}"
         print(error_msg)
         return {"status": "error", "message": error_msg}
 
 
-    df_fact['exchange_date'] = pd.to_datetime(df_fact['exchange_date']).dt.date
-    df_fact['load_timestamp'] = pd.to_datetime(df_fact['load_timestamp'])
+    try:
+        table = build_fact_arrow_table(df_fact)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, KeyError) as e:
+        error_msg = f"Error al construir la tabla Arrow para BigQuery: {e}"
+        print(error_msg)
+        return {"status": "error", "message": error_msg}
 
-    job_config = bigquery.LoadJobConfig(
+    if write_mode == 'merge':
+        try:
+            return merge_into_bigquery(client, table, BIGQUERY_TABLE_FULL_ID)
+        except Exception as e:
+            error_msg = f"Error fatal durante el MERGE en BigQuery: {e}"
+            print(error_msg)
+            return {"status": "error", "message": error_msg}
+
+    if write_mode == 'partition_overwrite':
+        try:
+            return overwrite_partitions_in_bigquery(client, table, BIGQUERY_TABLE_FULL_ID)
+        except Exception as e:
+            error_msg = f"Error fatal durante la sobrescritura de particiones en BigQuery: {e}"
+            print(error_msg)
+            return {"status": "error", "message": error_msg}
+
+    job_config = parquet_load_job_config(
         write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
     )
 
-    print(f"Iniciando la carga de {len(df_fact)} filas en {BIGQUERY_TABLE_FULL_ID}...")
+    print(f"Iniciando la carga de {table.num_rows} filas en {BIGQUERY_TABLE_FULL_ID}...")
 
     try:
-        job = client.load_table_from_dataframe(
-            df_fact, BIGQUERY_TABLE_FULL_ID, job_config=job_config
-        )  
+        job = load_arrow_table(client, table, BIGQUERY_TABLE_FULL_ID, job_config)
         
         job.result() 
 
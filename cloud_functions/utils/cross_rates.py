@@ -0,0 +1,127 @@
+import os
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from google.cloud import bigquery
+
+# 🗜️ Modelos compactos: se guarda un subconjunto de pares y el resto se deriva
+# en una vista con las columnas de fact_exchange_rates.
+#   compact:    solo las N tasas EUR/X (fact_base_rates).
+#   triangular: solo los pares con base < quote (fact_exchange_rate_pairs).
+FX_FACT_MODELS = ('full', 'triangular', 'compact')
+# Tabla que se carga en cada modelo derivado: (variable de entorno, nombre por defecto).
+FACT_MODEL_TABLES = {
+    'compact': ('BIGQUERY_BASE_TABLE_ID', 'fact_base_rates'),
+    'triangular': ('BIGQUERY_PAIRS_TABLE_ID', 'fact_exchange_rate_pairs'),
+}
+
+_ensured_views = set()
+_ensured_views_lock = threading.Lock()
+
+
+def get_fact_model() -> str:
+    """
+    Return the fact model selected by FX_FACT_MODEL: 'full' (default, every
+    cross pair is materialized and loaded), 'triangular' (only the pairs with
+    base_currency < quote_currency are loaded; mirrored and identity pairs
+    come from the view) or 'compact' (only the EUR/X base rates are loaded;
+    crosses come from the cross-rate view).
+    """
+    fact_model = os.getenv("FX_FACT_MODEL", "full")
+    if fact_model not in FX_FACT_MODELS:
+        raise ValueError(f"Modelo de hechos no soportado: {fact_model}. Opciones: {FX_FACT_MODELS}")
+    return fact_model
+
+
+def build_cross_rate_view_sql(view_id: str, base_table_id: str) -> str:
+    """
+    Build the statement that (re)creates the cross-rate view.
+
+    The base table holds one row per date and currency with the EUR/currency
+    rate (EUR/EUR included with rate 1), so a self-join on exchange_date
+    yields every base/quote pair with rate = quote / base, exactly like
+    build_cross_rate_cube.
+
+    Args:
+        view_id: View name, already quoted for the target engine.
+        base_table_id: Base rates table name, already quoted for the target engine.
+    Returns:
+        A CREATE OR REPLACE VIEW statement valid in BigQuery and DuckDB.
+    """
+    return f"""
+        CREATE OR REPLACE VIEW {view_id} AS
+        SELECT
+          b.exchange_date,
+          b.quote_currency AS base_currency,
+          q.quote_currency AS quote_currency,
+          CASE WHEN b.rate = 0 THEN 0 ELSE q.rate / b.rate END AS rate,
+          CASE WHEN q.rate = 0 THEN 0 ELSE b.rate / q.rate END AS rate_inverse,
+          q.data_source,
+          GREATEST(b.load_timestamp, q.load_timestamp) AS load_timestamp
+        FROM {base_table_id} b
+        JOIN {base_table_id} q
+          ON q.exchange_date = b.exchange_date
+    """
+
+
+def build_triangular_view_sql(view_id: str, pairs_table_id: str) -> str:
+    """
+    Build the statement that (re)creates the full pair view over a table that
+    only holds the pairs with base_currency < quote_currency.
+
+    Mirrored pairs swap the currencies and rate / rate_inverse of each stored
+    row; identity pairs (rate 1) are added for every currency of each date.
+
+    Args:
+        view_id: View name, already quoted for the target engine.
+        pairs_table_id: Upper-triangular pairs table name, already quoted for the target engine.
+    Returns:
+        A CREATE OR REPLACE VIEW statement valid in BigQuery and DuckDB.
+    """
+    return f"""
+        CREATE OR REPLACE VIEW {view_id} AS
+        SELECT exchange_date, base_currency, quote_currency, rate, rate_inverse, data_source, load_timestamp
+        FROM {pairs_table_id}
+        UNION ALL
+        SELECT exchange_date, quote_currency, base_currency, rate_inverse, rate, data_source, load_timestamp
+        FROM {pairs_table_id}
+        UNION ALL
+        SELECT exchange_date, currency, currency, 1, 1, ANY_VALUE(data_source), MAX(load_timestamp)
+        FROM (
+          SELECT exchange_date, base_currency AS currency, data_source, load_timestamp FROM {pairs_table_id}
+          UNION ALL
+          SELECT exchange_date, quote_currency, data_source, load_timestamp FROM {pairs_table_id}
+        )
+        GROUP BY exchange_date, currency
+    """
+
+
+CROSS_RATE_VIEW_BUILDERS = {
+    'compact': build_cross_rate_view_sql,
+    'triangular': build_triangular_view_sql,
+}
+
+
+def ensure_bigquery_cross_rate_view(client: 'bigquery.Client', view_full_id: str, table_full_id: str,
+                                    fact_model: str = 'compact') -> None:
+    """
+    Create or refresh the BigQuery view that exposes every pair over the
+    stored table, once per process. A plain view is always consistent with
+    the stored table, so nothing has to be maintained after each load.
+
+    Args:
+        client: BigQuery client.
+        view_full_id: View ID (project.dataset.view), e.g. the former fact_exchange_rates.
+        table_full_id: Stored table ID (fact_base_rates or fact_exchange_rate_pairs).
+        fact_model: 'compact' or 'triangular' (see CROSS_RATE_VIEW_BUILDERS).
+    """
+    key = (view_full_id, table_full_id)
+    if key in _ensured_views:
+        return
+    with _ensured_views_lock:
+        if key not in _ensured_views:
+            build_view_sql = CROSS_RATE_VIEW_BUILDERS[fact_model]
+            client.query(build_view_sql(f"`{view_full_id}`", f"`{table_full_id}`")).result()
+            print(f"Vista de tipos cruzados {view_full_id} actualizada sobre {table_full_id}.")
+            _ensured_views.add(key)
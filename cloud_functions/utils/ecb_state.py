@@ -0,0 +1,189 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit
+
+from cloud_functions.utils.watermarks import business_dates
+
+# 💾 Estado de las peticiones condicionales (ETag / Last-Modified / updatedAfter).
+# Ruta local o URI gs://bucket/objeto; en Cloud Functions /tmp no sobrevive a un
+# arranque en frío, así que en despliegue se guarda en GCS.
+ECB_STATE_PATH = os.getenv(
+    "ECB_STATE_PATH", os.path.join(tempfile.gettempdir(), "fx_ecb_state.json")
+)
+NOT_MODIFIED_STATUS_CODE = 304
+# El BCE responde 404 cuando la consulta no encuentra ninguna observación.
+NO_RESULTS_STATUS_CODE = 404
+# Parámetros de la ventana de fechas: no forman parte de la clave del estado.
+WINDOW_PARAMETERS = ('startPeriod', 'endPeriod', 'updatedAfter')
+
+_pending_state = {}
+_state_lock = threading.Lock()
+_storage_client = None
+_storage_lock = threading.Lock()
+
+
+def is_no_data_response(status_code: int, conditional: bool, start_date: str, end_date: str) -> bool:
+    """
+    Tell whether an ECB answer means "no (new) data" rather than an error.
+
+    A 404 is only expected for a conditional request with nothing new or for
+    a window without publication days; otherwise it points at a wrong series
+    key or ECB_API_BASE_URL and has to surface as an error.
+
+    Args:
+        status_code: HTTP status of the ECB response.
+        conditional: Whether the request carried conditional validators.
+        start_date: Start of the requested window ('YYYY-MM-DD').
+        end_date: End of the requested window ('YYYY-MM-DD').
+    Returns:
+        True for 304, and for 404 on conditional requests or empty windows.
+    """
+    if status_code == NOT_MODIFIED_STATUS_CODE:
+        return True
+    if status_code != NO_RESULTS_STATUS_CODE:
+        return False
+    return conditional or not business_dates(date.fromisoformat(start_date), date.fromisoformat(end_date))
+
+
+def ecb_state_key(url: str) -> str:
+    """
+    Key of the conditional request state of an ECB URL: the flow and series
+    key plus the format, without the date window. The daily job asks for a
+    window that moves every day, so its validators must not depend on it.
+
+    Args:
+        url: ECB data API URL.
+    Returns:
+        The key, e.g. 'EXR/D.NOK+SEK.EUR.SP00.A' or 'EXR/D.NOK+SEK.EUR.SP00.A?format=csvdata'.
+    """
+    parts = urlsplit(url)
+    key = '/'.join(parts.path.rstrip('/').split('/')[-2:])
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if k not in WINDOW_PARAMETERS])
+    return f"{key}?{query}" if query else key
+
+
+def _gcs_blob(uri: str):
+    # google-cloud-storage solo se carga si el estado se guarda en GCS.
+    global _storage_client
+    from google.cloud import storage
+
+    with _storage_lock:
+        if _storage_client is None:
+            _storage_client = storage.Client(project=os.getenv("GCP_PROJECT_ID"))
+    bucket, _, name = uri.removeprefix('gs://').partition('/')
+    return _storage_client.bucket(bucket).blob(name)
+
+
+def load_ecb_state() -> dict:
+    """
+    Read the persisted conditional request state from ECB_STATE_PATH (a
+    local file or a gs:// object), keyed by ecb_state_key.
+
+    Returns:
+        A dict of {key: {etag, last_modified, updated_after, start_period,
+        end_period, last_loaded_date}}.
+        An empty dict if the state does not exist or cannot be read.
+    """
+    try:
+        if ECB_STATE_PATH.startswith('gs://'):
+            from google.api_core.exceptions import NotFound
+
+            try:
+                return json.loads(_gcs_blob(ECB_STATE_PATH).download_as_bytes())
+            except NotFound:
+                return {}
+        with open(ECB_STATE_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_ecb_state(state: dict) -> None:
+    if ECB_STATE_PATH.startswith('gs://'):
+        _gcs_blob(ECB_STATE_PATH).upload_from_string(json.dumps(state), content_type='application/json')
+        return
+    tmp_path = f"{ECB_STATE_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, ECB_STATE_PATH)
+
+
+def _window(url: str) -> tuple[str, str]:
+    query = dict(parse_qsl(urlsplit(url).query))
+    return query.get('startPeriod'), query.get('endPeriod')
+
+
+def build_conditional_request(url: str) -> tuple[str, dict]:
+    """
+    Add the validators stored for the series of `url` to a new request.
+
+    updatedAfter only returns the observations published after the last
+    committed response, so it is only sent when the window starts after
+    the last loaded date; a missing older date (a deleted partition, or a
+    pair added to FX_PAIRS) is fetched unconditionally. The ETag and
+    Last-Modified identify one representation: they are only sent when the
+    stored response had the same startPeriod and endPeriod.
+
+    Args:
+        url: ECB data API URL, without the updatedAfter parameter.
+    Returns:
+        A tuple (request_url, headers); (url, {}) for an unconditional request.
+    """
+    entry = load_ecb_state().get(ecb_state_key(url), {})
+    start_period, end_period = _window(url)
+    last_loaded_date = entry.get('last_loaded_date')
+    if not last_loaded_date or not start_period or start_period <= last_loaded_date:
+        return url, {}
+
+    headers = {}
+    if (entry.get('start_period'), entry.get('end_period')) == (start_period, end_period):
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    if entry.get('updated_after'):
+        url = f"{url}&updatedAfter={quote(entry['updated_after'])}"
+    return url, headers
+
+
+def remember_ecb_response(url: str, response_headers, requested_at: datetime, last_observation: str) -> None:
+    """
+    Keep the validators of a successful response until the data is loaded.
+
+    Nothing is persisted here: call commit_ecb_state() once the batch has
+    been loaded, so a failed load is fetched again on the next run.
+
+    Args:
+        url: ECB data API URL, without the updatedAfter parameter.
+        response_headers: Headers of the ECB response.
+        requested_at: Timezone-aware time at which the request was sent.
+        last_observation: Latest exchange_date of the response ('YYYY-MM-DD');
+            once committed, every date of the window up to it is loaded.
+    """
+    start_period, end_period = _window(url)
+    with _state_lock:
+        _pending_state[ecb_state_key(url)] = {
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'updated_after': requested_at.isoformat(timespec='seconds'),
+            'start_period': start_period,
+            'end_period': end_period,
+            'last_loaded_date': last_observation,
+        }
+
+
+def commit_ecb_state() -> None:
+    """
+    Persist the validators remembered since the last commit. Entries of the
+    older per-URL layout (with the date window in the key) are dropped.
+    """
+    with _state_lock:
+        if not _pending_state:
+            return
+        state = {key: entry for key, entry in load_ecb_state().items() if key == ecb_state_key(key)}
+        state.update(_pending_state)
+        _save_ecb_state(state)
+        _pending_state.clear()
@@ -0,0 +1,93 @@
+import io
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ⏱️ Timeouts acotados (connect, read) en segundos para cada petición al BCE.
+ECB_TIMEOUT = (
+    float(os.getenv("ECB_CONNECT_TIMEOUT", "5")),
+    float(os.getenv("ECB_READ_TIMEOUT", "60")),
+)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_ecb_session() -> requests.Session:
+    retry = Retry(
+        total=int(os.getenv("ECB_MAX_RETRIES", "5")),
+        backoff_factor=0.5,
+        backoff_max=30,
+        backoff_jitter=0.5,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    pool_size = int(os.getenv("ECB_POOL_MAXSIZE", "10"))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    return session
+
+
+def get_ecb_session() -> requests.Session:
+    """
+    Return the process-wide HTTP session used to call the ECB API.
+
+    The session is created lazily on first use and kept for the lifetime of
+    the Cloud Function instance, so warm invocations reuse pooled keep-alive
+    connections. Retries use exponential backoff with jitter on 429/5xx.
+
+    Returns:
+        A requests.Session with a pooled, retrying HTTPAdapter.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_ecb_session()
+    return _session
+
+
+class _ResponseReader(io.RawIOBase):
+    def __init__(self, response: requests.Response, chunk_size: int):
+        self._chunks = response.iter_content(chunk_size)
+        self._pending = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def open_response_stream(response: requests.Response, chunk_size: int = 64 * 1024) -> io.BufferedReader:
+    """
+    Expose a streamed response body as a readable, decompressed file object.
+
+    Reading through `iter_content` (instead of `response.raw`) lets requests
+    return the connection to the pool once the body has been consumed.
+
+    Args:
+        response: A response obtained with stream=True.
+        chunk_size: Size of the chunks pulled from the socket.
+    Returns:
+        A buffered binary file object over the response body.
+    """
+    return io.BufferedReader(_ResponseReader(response, chunk_size), buffer_size=chunk_size)
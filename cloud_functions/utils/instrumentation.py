@@ -0,0 +1,132 @@
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# 📈 Métricas por etapa (E, T, L) emitidas como líneas JSON para Cloud Logging.
+FX_TRACEMALLOC = os.getenv("FX_TRACEMALLOC", "false").lower() == "true"
+
+_current_stage = contextvars.ContextVar('fx_current_stage', default=None)
+_collected_stages = contextvars.ContextVar('fx_collected_stages', default=None)
+_lock = threading.Lock()
+
+
+def record_stage_metrics(**fields) -> None:
+    """
+    Add fields (e.g. bytes_downloaded) to the metrics of the running stage.
+    Numeric fields are accumulated, so concurrent sub-requests can report into
+    the same stage. Does nothing outside an instrumented stage.
+    """
+    stage = _current_stage.get()
+    if stage is None:
+        return
+    with _lock:
+        for key, value in fields.items():
+            if isinstance(value, (int, float)) and isinstance(stage.get(key), (int, float)):
+                stage[key] += value
+            else:
+                stage[key] = value
+
+
+def _rows(value):
+    if hasattr(value, 'shape'):
+        return len(value)
+    if isinstance(value, dict) and 'rows_inserted' in value:
+        return value.get('rows_inserted', 0) + value.get('rows_updated', 0)
+    return None
+
+
+def _status(result) -> str:
+    if isinstance(result, tuple) or (isinstance(result, dict) and result.get('status') == 'error'):
+        return 'error'
+    return 'success'
+
+
+def emit_stage_metrics(stage: dict) -> None:
+    """
+    Print one structured log line; Cloud Logging parses it into jsonPayload.
+    """
+    print(json.dumps({
+        'severity': 'ERROR' if stage['status'] != 'success' else 'INFO',
+        'message': f"fx_etl stage {stage['stage']}: {stage['wall_s']:.3f}s, {stage['rows_out']} filas",
+        'component': 'fx_etl',
+        **stage,
+    }, default=str))
+
+
+def instrumented_stage(name: str):
+    """
+    Decorator that measures one pipeline stage per call.
+
+    Records wall time, CPU time (whole process), rows in (first DataFrame
+    argument) and rows out (returned DataFrame, or rows_inserted +
+    rows_updated of a load result), the fields added with
+    record_stage_metrics, and, with FX_TRACEMALLOC=true, the tracemalloc peak
+    reached while the stage ran (process-wide, so it includes overlapping stages).
+
+    Args:
+        name: Stage name ('extract', 'transform', 'load', ...).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stage = {
+                'stage': name,
+                'rows_in': next((_rows(arg) for arg in args if hasattr(arg, 'shape')), None),
+            }
+            if FX_TRACEMALLOC and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            baseline = 0
+            if tracemalloc.is_tracing():
+                baseline = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+
+            token = _current_stage.set(stage)
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            result = None
+            status = 'exception'
+            try:
+                result = func(*args, **kwargs)
+                status = _status(result)
+                return result
+            finally:
+                _current_stage.reset(token)
+                wall_s = time.perf_counter() - wall_start
+                rows_out = _rows(result)
+                stage.update({
+                    'status': status,
+                    'wall_s': round(wall_s, 6),
+                    'cpu_s': round(time.process_time() - cpu_start, 6),
+                    'rows_out': rows_out,
+                    'rows_per_s': round(rows_out / wall_s, 1) if rows_out and wall_s > 0 else None,
+                    'peak_mem_mb': round((tracemalloc.get_traced_memory()[1] - baseline) / 1e6, 3)
+                    if tracemalloc.is_tracing() else None,
+                })
+                collected = _collected_stages.get()
+                if collected is not None:
+                    with _lock:
+                        collected.append(stage)
+                emit_stage_metrics(stage)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def collect_stage_metrics():
+    """
+    Collect the metrics of every stage run inside the block (including stages
+    run in worker threads started with contextvars.copy_context()).
+
+    Yields:
+        The list that receives one metrics dict per stage.
+    """
+    stages = []
+    token = _collected_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _collected_stages.reset(token)
@@ -0,0 +1,377 @@
+import io
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.cloud import bigquery
+
+# 🔑 Clave natural de la tabla de hechos.
+FACT_KEY_COLUMNS = ['exchange_date', 'base_currency', 'quote_currency']
+FACT_VALUE_COLUMNS = ['rate', 'rate_inverse', 'data_source', 'load_timestamp']
+
+# 🏹 Esquema Arrow de la tabla de hechos (espejo del DDL de BigQuery).
+FACT_ARROW_SCHEMA = pa.schema([
+    pa.field('exchange_date', pa.date32(), nullable=False),
+    pa.field('base_currency', pa.dictionary(pa.int8(), pa.string()), nullable=False),
+    pa.field('quote_currency', pa.dictionary(pa.int8(), pa.string()), nullable=False),
+    pa.field('rate', pa.decimal256(76, 38), nullable=False),
+    pa.field('rate_inverse', pa.decimal256(76, 38)),
+    pa.field('data_source', pa.dictionary(pa.int8(), pa.string())),
+    pa.field('load_timestamp', pa.timestamp('us', tz='UTC'), nullable=False),
+])
+BIGQUERY_PARQUET_COMPRESSION = os.getenv("BIGQUERY_PARQUET_COMPRESSION", "zstd")
+# Caducidad de las tablas _staging_* del modo merge: si el proceso muere antes
+# de borrarlas, BigQuery las elimina solo.
+STAGING_TABLE_EXPIRATION = timedelta(hours=1)
+# Cuotas de BigQuery por tabla: 5 operaciones que actualizan metadatos cada 10 s
+# (cada carga en table$YYYYMMDD es una) y 1.500 trabajos de carga al día.
+RATE_LIMIT_REASONS = frozenset({'rateLimitExceeded', 'quotaExceeded'})
+
+
+def _to_arrow(column: pd.Series, field: pa.Field) -> pa.Array:
+    values = pa.array(column, from_pandas=True)
+    if pa.types.is_dictionary(values.type):
+        # Columnas categóricas: se convierte solo el diccionario y se expande por índice.
+        if pa.types.is_dictionary(field.type):
+            return values.cast(field.type)
+        return _to_arrow(values.dictionary.to_pandas(), field).take(values.indices)
+    if pa.types.is_dictionary(field.type):
+        return values.cast(field.type.value_type).dictionary_encode().cast(field.type)
+    if pa.types.is_decimal(field.type):
+        # Vía texto con el repr más corto del float: 11.4395 -> 11.4395 exacto,
+        # sin los artefactos binarios de un cast directo float -> decimal.
+        return values.cast(pa.string()).cast(field.type)
+    if pa.types.is_timestamp(field.type) and not pa.types.is_timestamp(values.type):
+        # load_timestamp se genera en UTC sin offset explícito.
+        values = values.cast(pa.timestamp(field.type.unit))
+    return values.cast(field.type)
+
+
+def build_fact_arrow_table(df_fact: pd.DataFrame) -> pa.Table:
+    """
+    Convert the fact DataFrame into a pyarrow Table with FACT_ARROW_SCHEMA,
+    without pandas type inference and without modifying `df_fact`.
+
+    Args:
+        df_fact: DataFrame with the fact_exchange_rates structure.
+    Returns:
+        A pyarrow Table matching the BigQuery table types.
+    """
+    return pa.Table.from_arrays(
+        [_to_arrow(df_fact[field.name], field) for field in FACT_ARROW_SCHEMA],
+        schema=FACT_ARROW_SCHEMA,
+    )
+
+
+def write_parquet_buffer(table: pa.Table, compression: str = None) -> io.BytesIO:
+    """
+    Serialize a Table as a compressed Parquet file in memory.
+
+    Args:
+        table: Table to serialize.
+        compression: Parquet codec. Defaults to BIGQUERY_PARQUET_COMPRESSION, or 'zstd'.
+    Returns:
+        A BytesIO positioned at the start of the Parquet file.
+    """
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression=compression or BIGQUERY_PARQUET_COMPRESSION)
+    buffer.seek(0)
+    return buffer
+
+
+def parquet_load_job_config(**kwargs) -> bigquery.LoadJobConfig:
+    """
+    LoadJobConfig for Parquet payloads built from FACT_ARROW_SCHEMA; the
+    decimal256(76, 38) columns are loaded as BIGNUMERIC.
+    """
+    return bigquery.LoadJobConfig(
+        source_format=bigquery.SourceFormat.PARQUET,
+        decimal_target_types=[bigquery.DecimalTargetType.NUMERIC, bigquery.DecimalTargetType.BIGNUMERIC],
+        **kwargs,
+    )
+
+
+def load_arrow_table(client: bigquery.Client, table: pa.Table, destination: str,
+                     job_config: bigquery.LoadJobConfig) -> bigquery.LoadJob:
+    """
+    Start a load job for an Arrow table serialized as in-memory Parquet.
+
+    Args:
+        client: BigQuery client.
+        table: Table with FACT_ARROW_SCHEMA.
+        destination: Destination table ID, optionally with a partition decorator.
+        job_config: Config from parquet_load_job_config.
+    Returns:
+        The started LoadJob.
+    """
+    return client.load_table_from_file(write_parquet_buffer(table), destination, job_config=job_config)
+
+
+def _date_literals(table: pa.Table) -> str:
+    dates = sorted(table['exchange_date'].unique().to_pylist())
+    return ", ".join(f"DATE '{d.isoformat()}'" for d in dates)
+
+
+def build_merge_sql(target_table_id: str, staging_table_id: str, date_literals: str) -> str:
+    """
+    Build the MERGE statement that upserts the staging batch into the fact table.
+
+    The target side is restricted to the partitions present in the batch
+    with constant date literals, so BigQuery prunes every other partition.
+    Matched rows are only rewritten when one of their values changed.
+
+    Args:
+        target_table_id: Fact table ID (project.dataset.table).
+        staging_table_id: Staging table ID holding the batch.
+        date_literals: Comma-separated DATE literals of the affected partitions.
+    Returns:
+        The MERGE statement.
+    """
+    on_clause = " AND ".join(f"T.{c} = S.{c}" for c in FACT_KEY_COLUMNS)
+    changed = " OR ".join(f"T.{c} IS DISTINCT FROM S.{c}" for c in FACT_VALUE_COLUMNS if c != 'load_timestamp')
+    update_set = ", ".join(f"{c} = S.{c}" for c in FACT_VALUE_COLUMNS)
+    columns = ", ".join(FACT_KEY_COLUMNS + FACT_VALUE_COLUMNS)
+    values = ", ".join(f"S.{c}" for c in FACT_KEY_COLUMNS + FACT_VALUE_COLUMNS)
+
+    return f"""
+        MERGE `{target_table_id}` T
+        USING `{staging_table_id}` S
+        ON {on_clause}
+           AND T.exchange_date IN ({date_literals})
+        WHEN MATCHED AND ({changed}) THEN
+          UPDATE SET {update_set}
+        WHEN NOT MATCHED THEN
+          INSERT ({columns}) VALUES ({values})
+    """
+
+
+def _staging_table_id(table_full_id: str) -> str:
+    project, dataset, table_name = table_full_id.split('.')
+    return f"{project}.{dataset}._staging_{table_name}_{uuid.uuid4().hex}"
+
+
+def _load_staging_table(client: bigquery.Client, table: pa.Table, table_full_id: str,
+                        staging_table_id: str) -> None:
+    target = client.get_table(table_full_id)
+    staging_table = bigquery.Table(staging_table_id, schema=target.schema)
+    staging_table.expires = datetime.now(timezone.utc) + STAGING_TABLE_EXPIRATION
+    job_config = parquet_load_job_config(
+        schema=target.schema,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+    )
+
+    print(f"Cargando {table.num_rows} filas en la tabla temporal {staging_table_id}...")
+
+    client.create_table(staging_table)
+    _run_job_with_retry(lambda: load_arrow_table(client, table, staging_table_id, job_config), staging_table_id)
+
+
+def _is_rate_limit_error(exc: Exception) -> bool:
+    if getattr(exc, 'code', None) == 429:
+        return True
+    return any(error.get('reason') in RATE_LIMIT_REASONS for error in getattr(exc, 'errors', None) or [])
+
+
+def _run_job_with_retry(start_job, description: str):
+    """
+    Start a BigQuery job and wait for it, starting it again with exponential
+    backoff and jitter while it fails with a rate-limit error.
+
+    Args:
+        start_job: Callable that starts the job and returns it.
+        description: Destination shown in the retry messages.
+    Returns:
+        The finished job.
+    """
+    max_retries = int(os.getenv("BIGQUERY_RATE_LIMIT_RETRIES", "5"))
+    for attempt in range(max_retries + 1):
+        try:
+            job = start_job()
+            job.result()
+            return job
+        except Exception as e:
+            if attempt == max_retries or not _is_rate_limit_error(e):
+                raise
+            delay = min(2 ** attempt, 32) + random.uniform(0, 1)
+            print(f"Límite de tasa de BigQuery en {description}; reintento {attempt + 1}/{max_retries} en {delay:.1f} s...")
+            time.sleep(delay)
+
+
+def merge_into_bigquery(client: bigquery.Client, table: pa.Table, table_full_id: str) -> dict:
+    """
+    Idempotent upsert: stage the batch in a temporary table and MERGE it on
+    (exchange_date, base_currency, quote_currency) into the fact table.
+    The staging table is deleted afterwards and expires after
+    STAGING_TABLE_EXPIRATION in case the instance dies before that.
+
+    Args:
+        client: BigQuery client.
+        table: Arrow table built with build_fact_arrow_table.
+        table_full_id: Fact table ID (project.dataset.table).
+    Returns:
+        A dictionary with the status and the inserted / updated row counts.
+    """
+    staging_table_id = _staging_table_id(table_full_id)
+
+    try:
+        _load_staging_table(client, table, table_full_id, staging_table_id)
+
+        merge_job = client.query(build_merge_sql(table_full_id, staging_table_id, _date_literals(table)))
+        merge_job.result()
+    finally:
+        client.delete_table(staging_table_id, not_found_ok=True)
+
+    stats = merge_job.dml_stats
+    rows_inserted = stats.inserted_row_count if stats else 0
+    rows_updated = stats.updated_row_count if stats else 0
+
+    print(f"MERGE completado en {table_full_id}. Filas insertadas: {rows_inserted}, actualizadas: {rows_updated}.")
+    return {
+        "status": "success",
+        "message": "Data successfully merged into BigQuery.",
+        "rows_inserted": rows_inserted,
+        "rows_updated": rows_updated,
+        "destination_table": table_full_id
+    }
+
+
+def _split_by_date(table: pa.Table) -> list[tuple[str, pa.Table]]:
+    table = table.sort_by('exchange_date')
+    days = table['exchange_date'].cast(pa.int32()).to_numpy()
+    _, starts = np.unique(days, return_index=True)
+    ends = np.append(starts[1:], len(days))
+    return [
+        (table['exchange_date'][int(start)].as_py().strftime('%Y%m%d'), table.slice(start, end - start))
+        for start, end in zip(starts, ends)
+    ]
+
+
+def build_partition_replace_sql(target_table_id: str, staging_table_id: str, date_literals: str) -> str:
+    """
+    Build the transaction that replaces the batch's dates in the fact table:
+    delete every row of those dates, then insert the staging batch.
+
+    Args:
+        target_table_id: Fact table ID (project.dataset.table).
+        staging_table_id: Staging table ID holding the batch.
+        date_literals: Comma-separated DATE literals of the affected partitions.
+    Returns:
+        The multi-statement transaction.
+    """
+    columns = ", ".join(FACT_KEY_COLUMNS + FACT_VALUE_COLUMNS)
+
+    return f"""
+        BEGIN TRANSACTION;
+        DELETE FROM `{target_table_id}` WHERE exchange_date IN ({date_literals});
+        INSERT INTO `{target_table_id}` ({columns})
+        SELECT {columns} FROM `{staging_table_id}`;
+        COMMIT TRANSACTION;
+    """
+
+
+def replace_partitions_in_bigquery(client: bigquery.Client, table: pa.Table, table_full_id: str) -> dict:
+    """
+    Replace every day of the batch with one load job into a staging table and
+    one DELETE + INSERT transaction, whatever the number of days. Same result
+    as the per-partition loads, within the per-table metadata and load-job quotas.
+
+    Args:
+        client: BigQuery client.
+        table: Arrow table built with build_fact_arrow_table.
+        table_full_id: Fact table ID (project.dataset.table).
+    Returns:
+        A dictionary with the status, the rows loaded and the partitions replaced.
+    """
+    staging_table_id = _staging_table_id(table_full_id)
+    sql = build_partition_replace_sql(table_full_id, staging_table_id, _date_literals(table))
+    partitions_replaced = len(table['exchange_date'].unique())
+
+    try:
+        _load_staging_table(client, table, table_full_id, staging_table_id)
+        _run_job_with_retry(lambda: client.query(sql), table_full_id)
+    finally:
+        client.delete_table(staging_table_id, not_found_ok=True)
+
+    print(f"Reemplazo de {partitions_replaced} particiones completado en {table_full_id}. Filas cargadas: {table.num_rows}.")
+    return {
+        "status": "success",
+        "message": "Partitions successfully replaced in BigQuery.",
+        "rows_inserted": table.num_rows,
+        "partitions_replaced": partitions_replaced,
+        "destination_table": table_full_id
+    }
+
+
+def overwrite_partitions_in_bigquery(client: bigquery.Client, table: pa.Table, table_full_id: str) -> dict:
+    """
+    Replace each affected day atomically by loading it into its partition
+    decorator (`table$YYYYMMDD`) with WRITE_TRUNCATE. No DML, no table scan.
+
+    Every partition load is a metadata update of the table, limited by
+    BigQuery to 5 per 10 seconds and 1,500 load jobs per day. The loads run
+    concurrently (up to BIGQUERY_PARTITION_LOAD_WORKERS at a time) and are
+    retried with backoff on rate-limit errors; batches with more than
+    BIGQUERY_PARTITION_OVERWRITE_MAX_JOBS days go through
+    replace_partitions_in_bigquery instead.
+
+    Args:
+        client: BigQuery client.
+        table: Arrow table built with build_fact_arrow_table.
+        table_full_id: Fact table ID (project.dataset.table).
+    Returns:
+        A dictionary with the status, the rows loaded and the partitions replaced.
+    """
+    partitions = _split_by_date(table)
+    max_jobs = int(os.getenv("BIGQUERY_PARTITION_OVERWRITE_MAX_JOBS", "4"))
+    if len(partitions) > max_jobs:
+        print(f"{len(partitions)} particiones superan BIGQUERY_PARTITION_OVERWRITE_MAX_JOBS={max_jobs}; "
+              f"se reemplazan con una transacción.")
+        return replace_partitions_in_bigquery(client, table, table_full_id)
+
+    job_config = parquet_load_job_config(
+        write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+    )
+
+    print(f"Sobrescribiendo {len(partitions)} particiones de {table_full_id}...")
+
+    def overwrite(partition):
+        partition_id, partition_table = partition
+        destination = f"{table_full_id}${partition_id}"
+        try:
+            job = _run_job_with_retry(
+                lambda: load_arrow_table(client, partition_table, destination, job_config), destination
+            )
+            return destination, job.output_rows
+        except Exception as e:
+            print(f"Error al sobrescribir la partición {destination}: {e}")
+            return destination, None
+
+    max_workers = int(os.getenv("BIGQUERY_PARTITION_LOAD_WORKERS", "8"))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(overwrite, partitions))
+
+    rows_inserted = sum(rows for _, rows in results if rows is not None)
+    failed_partitions = [destination for destination, rows in results if rows is None]
+
+    if failed_partitions:
+        return {
+            "status": "error",
+            "message": f"Fallo al sobrescribir {len(failed_partitions)} particiones: {failed_partitions}",
+            "rows_inserted": rows_inserted
+        }
+
+    print(f"Sobrescritura completada en {table_full_id}. Filas cargadas: {rows_inserted}.")
+    return {
+        "status": "success",
+        "message": "Partitions successfully overwritten in BigQuery.",
+        "rows_inserted": rows_inserted,
+        "partitions_replaced": len(partitions),
+        "destination_table": table_full_id
+    }
@@ -0,0 +1,126 @@
+import contextvars
+import os
+import queue
+import threading
+
+FX_EXECUTORS = ('sequential', 'pipelined')
+
+# Marca de fin de flujo entre etapas.
+_DONE = object()
+
+
+def get_executor(executor: str = None) -> str:
+    """
+    Backfill executor: 'sequential' (extract the whole range, then transform
+    and load it) or 'pipelined' (see run_pipelined).
+
+    Args:
+        executor: Explicit executor. Defaults to the FX_EXECUTOR env var, or 'sequential'.
+    Returns:
+        The executor name.
+    """
+    executor = executor or os.getenv("FX_EXECUTOR", "sequential")
+    if executor not in FX_EXECUTORS:
+        raise ValueError(f"Ejecutor no soportado: {executor}. Usa uno de {FX_EXECUTORS}.")
+    return executor
+
+
+def run_pipelined(windows, extract, transform, load, queue_size: int = None):
+    """
+    Run extract, transform and load as three concurrent stages connected by
+    bounded queues: window k+1 is downloaded while window k is transformed
+    and the blocks of window k-1 are loaded. A full queue blocks the stage
+    that feeds it, so at most `queue_size` items wait between two stages.
+
+    The extract and transform stages run in worker threads (with a copy of
+    the caller's context, so their stage metrics are collected) and the load
+    stage runs in the calling thread. The first failure stops every stage.
+
+    Args:
+        windows: (start_date, end_date) tuples, in the order they are loaded.
+        extract: Called with each window; returns a DataFrame, None (no data)
+            or an error tuple.
+        transform: Called with each extracted DataFrame; returns an iterable
+            of fact DataFrames.
+        load: Called with each non-empty fact DataFrame; returns a load result dict.
+        queue_size: Capacity of each queue. Defaults to FX_PIPELINE_QUEUE_SIZE, or 2.
+    Returns:
+        A (load_results, error) tuple: the results of every load, in order, and
+        the first extraction error tuple or load result with status 'error', or None.
+    """
+    queue_size = queue_size or int(os.getenv("FX_PIPELINE_QUEUE_SIZE", "2"))
+    extracted = queue.Queue(maxsize=queue_size)
+    transformed = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    failure = {}
+
+    def fail(key, value):
+        failure.setdefault(key, value)
+        stop.set()
+
+    def put(stage_queue, item) -> bool:
+        # Espera con timeout para no quedar bloqueado si otra etapa ha fallado.
+        while not stop.is_set():
+            try:
+                stage_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(stage_queue):
+        while not stop.is_set():
+            try:
+                return stage_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def extract_stage():
+        try:
+            for window in windows:
+                result = extract(*window)
+                if isinstance(result, tuple):
+                    fail('error', result)
+                    return
+                if result is not None and not put(extracted, result):
+                    return
+        except BaseException as e:
+            fail('exception', e)
+        finally:
+            put(extracted, _DONE)
+
+    def transform_stage():
+        try:
+            while (df_base_rates := get(extracted)) is not _DONE:
+                for df_fact in transform(df_base_rates):
+                    if not df_fact.empty and not put(transformed, df_fact):
+                        return
+        except BaseException as e:
+            fail('exception', e)
+        finally:
+            put(transformed, _DONE)
+
+    workers = [
+        threading.Thread(target=contextvars.copy_context().run, args=(stage,), name=f"fx-{stage.__name__}", daemon=True)
+        for stage in (extract_stage, transform_stage)
+    ]
+    for worker in workers:
+        worker.start()
+
+    load_results = []
+    try:
+        while (df_fact := get(transformed)) is not _DONE:
+            load_result = load(df_fact)
+            load_results.append(load_result)
+            if load_result['status'] == 'error':
+                fail('error', load_result)
+    except BaseException as e:
+        fail('exception', e)
+    finally:
+        for worker in workers:
+            worker.join()
+
+    if 'exception' in failure:
+        raise failure['exception']
+    return load_results, failure.get('error')
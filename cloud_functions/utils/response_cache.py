@@ -0,0 +1,223 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 🗄️ Caché local de respuestas del BCE (por defecto en /tmp en Cloud Functions).
+ECB_CACHE_DIR = os.getenv("ECB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "fx_ecb_cache"))
+ECB_CACHE_MAX_BYTES = int(float(os.getenv("ECB_CACHE_MAX_MB", "256")) * 1024 * 1024)
+ECB_CACHE_RECENT_TTL = int(os.getenv("ECB_CACHE_RECENT_TTL", "900"))
+
+PAYLOAD_SUFFIX = '.gz'
+METADATA_SUFFIX = '.json'
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize an ECB URL so equivalent requests share one cache entry.
+
+    Args:
+        url: Request URL.
+    Returns:
+        The URL with a lower-cased scheme and host and sorted query parameters.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+
+
+def ttl_for_window(end_date: str):
+    """
+    Time to live of a cached window: closed historical windows never expire,
+    windows that include today expire after ECB_CACHE_RECENT_TTL seconds.
+
+    Args:
+        end_date: Last date of the requested window, in 'YYYY-MM-DD' format.
+    Returns:
+        The TTL in seconds, or None if the entry never expires.
+    """
+    if date.fromisoformat(end_date) < date.today():
+        return None
+    return ECB_CACHE_RECENT_TTL
+
+
+class _CachingReader(io.RawIOBase):
+    """
+    Pass-through reader that writes the bytes it reads into a compressed
+    temporary file, published to the cache only when commit() is called.
+    """
+
+    def __init__(self, cache: 'ResponseCache', key: str, url: str, source, ttl):
+        self._cache = cache
+        self._key = key
+        self._url = url
+        self._source = source
+        self._ttl = ttl
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache.directory, suffix='.tmp')
+        self._tmp_file = os.fdopen(fd, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._tmp_file, mode='wb', compresslevel=6)
+        self._committed = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._source.read(len(buffer))
+        if not data:
+            return 0
+        self._gzip.write(data)
+        size = len(data)
+        buffer[:size] = data
+        return size
+
+    def commit(self) -> None:
+        """
+        Drain the rest of the source and publish the payload to the cache.
+        """
+        while chunk := self._source.read(64 * 1024):
+            self._gzip.write(chunk)
+        self._gzip.close()
+        self._tmp_file.close()
+        self._cache._publish(self._key, self._url, self._tmp_path, self._ttl)
+        self._committed = True
+
+    def close(self):
+        if not self.closed and not self._committed:
+            self._gzip.close()
+            self._tmp_file.close()
+            os.remove(self._tmp_path)
+        super().close()
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache of compressed raw ECB payloads.
+
+    Entries are keyed by the SHA-256 of the normalized URL, expire according
+    to their TTL, and are evicted least-recently-used first once the total
+    size exceeds `max_bytes`.
+    """
+
+    def __init__(self, directory: str = ECB_CACHE_DIR, max_bytes: int = ECB_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def _remove(self, key: str) -> None:
+        for suffix in (PAYLOAD_SUFFIX, METADATA_SUFFIX):
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def open(self, url: str):
+        """
+        Open the cached payload for `url`.
+
+        Args:
+            url: Request URL.
+        Returns:
+            A readable, decompressed file object, or None on a miss or expired entry.
+        """
+        key = self._key(url)
+        try:
+            with open(self._path(key, METADATA_SUFFIX), encoding='utf-8') as f:
+                metadata = json.load(f)
+            payload = gzip.open(self._path(key, PAYLOAD_SUFFIX), 'rb')
+        except (OSError, ValueError):
+            return None
+
+        if metadata['expires_at'] is not None and metadata['expires_at'] < time.time():
+            payload.close()
+            self._remove(key)
+            return None
+
+        # El mtime del payload marca el último acceso (orden LRU).
+        os.utime(self._path(key, PAYLOAD_SUFFIX))
+        return payload
+
+    def record(self, url: str, source, ttl) -> _CachingReader:
+        """
+        Wrap a response stream so that what is read from it is also cached.
+
+        Args:
+            url: Request URL.
+            source: Readable file object with the raw payload.
+            ttl: Seconds until the entry expires, or None to never expire.
+        Returns:
+            A readable file object; call its commit() once parsing succeeded.
+        """
+        return _CachingReader(self, self._key(url), url, source, ttl)
+
+    def store(self, url: str, payload: bytes, ttl) -> None:
+        """
+        Cache an already downloaded payload.
+
+        Args:
+            url: Request URL.
+            payload: Raw response bytes.
+            ttl: Seconds until the entry expires, or None to never expire.
+        """
+        writer = self.record(url, io.BytesIO(payload), ttl)
+        writer.commit()
+        writer.close()
+
+    def _publish(self, key: str, url: str, tmp_path: str, ttl) -> None:
+        metadata = {
+            'url': normalize_url(url),
+            'expires_at': None if ttl is None else time.time() + ttl,
+        }
+        with self._lock:
+            os.replace(tmp_path, self._path(key, PAYLOAD_SUFFIX))
+            with open(self._path(key, METADATA_SUFFIX), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f)
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total_bytes = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(PAYLOAD_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.name[:-len(PAYLOAD_SUFFIX)]))
+                    total_bytes += stat.st_size
+
+        for _, size, key in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(key)
+            total_bytes -= size
+
+
+def get_response_cache():
+    """
+    Return the process-wide response cache, created lazily on first use.
+
+    Returns:
+        A ResponseCache, or None if ECB_CACHE_ENABLED is 'false'.
+    """
+    global _cache
+    if os.getenv("ECB_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
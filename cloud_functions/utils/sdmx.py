@@ -0,0 +1,201 @@
+from array import array
+
+import ijson
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+SERIES_PREFIX = 'dataSets.item.series'
+SERIES_DIMENSIONS_PREFIX = 'structure.dimensions.series'
+OBSERVATION_DIMENSIONS_PREFIX = 'structure.dimensions.observation'
+CURRENCY_DIMENSION = 'CURRENCY'
+TIME_DIMENSION = 'TIME_PERIOD'
+OBS_VALUE_COLUMN = 'OBS_VALUE'
+
+
+class SdmxObservations:
+    """
+    Compact typed buffers filled while streaming an SDMX-JSON payload.
+
+    Each observation costs a few bytes (series ordinal, time index and rate)
+    instead of one Python dict, so memory stays flat whatever the date range.
+    """
+
+    def __init__(self):
+        self.series_keys = []
+        self.series_index = array('H')
+        self.time_index = array('I')
+        self.rate = array('d')
+        self.series_dimensions = []
+        self.observation_dimensions = []
+
+    def __len__(self):
+        return len(self.rate)
+
+
+def stream_sdmx_observations(stream) -> SdmxObservations:
+    """
+    Read `dataSets[0].series[*].observations` from an SDMX-JSON byte stream.
+
+    The payload is tokenized incrementally, so the JSON object tree is never
+    built. Only the ids of the structure dimensions are kept for decoding.
+
+    Args:
+        stream: File-like object returning the raw JSON bytes (e.g. `response.raw`).
+    Returns:
+        An SdmxObservations instance with the observations and dimension ids.
+    """
+    buffers = SdmxObservations()
+    series_key_prefix = SERIES_PREFIX + '.'
+
+    current_series = -1
+    observations_prefix = ''
+    observation_item_prefix = ''
+    time_index = 0
+    value_position = 0
+
+    for prefix, event, value in ijson.parse(stream, use_float=True):
+        if prefix == SERIES_PREFIX:
+            if event == 'map_key':
+                current_series = len(buffers.series_keys)
+                buffers.series_keys.append(value)
+                observations_prefix = f"{series_key_prefix}{value}.observations"
+            continue
+
+        if prefix.startswith(series_key_prefix):
+            if prefix == observations_prefix:
+                if event == 'map_key':
+                    time_index = int(value)
+                    value_position = 0
+                    observation_item_prefix = f"{observations_prefix}.{value}.item"
+            elif prefix == observation_item_prefix:
+                # Sólo interesa el primer valor de cada observación (OBS_VALUE).
+                if value_position == 0 and event == 'number':
+                    buffers.series_index.append(current_series)
+                    buffers.time_index.append(time_index)
+                    buffers.rate.append(value)
+                value_position += 1
+            continue
+
+        if prefix == SERIES_DIMENSIONS_PREFIX + '.item' and event == 'start_map':
+            buffers.series_dimensions.append({'id': None, 'values': []})
+        elif prefix == SERIES_DIMENSIONS_PREFIX + '.item.id':
+            buffers.series_dimensions[-1]['id'] = value
+        elif prefix == SERIES_DIMENSIONS_PREFIX + '.item.values.item.id':
+            buffers.series_dimensions[-1]['values'].append(value)
+        elif prefix == OBSERVATION_DIMENSIONS_PREFIX + '.item' and event == 'start_map':
+            buffers.observation_dimensions.append({'id': None, 'values': []})
+        elif prefix == OBSERVATION_DIMENSIONS_PREFIX + '.item.id':
+            buffers.observation_dimensions[-1]['id'] = value
+        elif prefix == OBSERVATION_DIMENSIONS_PREFIX + '.item.values.item.id':
+            buffers.observation_dimensions[-1]['values'].append(value)
+
+    return buffers
+
+
+class SdmxStructure:
+    """
+    Flat lookup tables decoded once from the SDMX structure block.
+
+    Attributes:
+        time_periods: Array mapping observation time index -> 'YYYY-MM-DD' date.
+        series_currency: Array mapping series ordinal -> quote currency code.
+    """
+
+    def __init__(self, time_periods: np.ndarray, series_currency: np.ndarray):
+        self.time_periods = time_periods
+        self.series_currency = series_currency
+
+
+def _find_dimension(dimensions: list, dimension_id: str, default_position: int) -> tuple[int, list]:
+    for position, dimension in enumerate(dimensions):
+        if dimension['id'] == dimension_id:
+            return position, dimension['values']
+    return default_position, dimensions[default_position]['values']
+
+
+def decode_sdmx_structure(buffers: SdmxObservations) -> SdmxStructure:
+    """
+    Build the index -> value lookup tables used to decode the observations.
+
+    The quote currency of each series is read from its series key
+    (e.g. '0:3:0:0:0'), at the position of the CURRENCY dimension.
+
+    Args:
+        buffers: Observations and dimension ids read from the payload.
+    Returns:
+        An SdmxStructure with the time period and series currency lookups.
+    """
+    _, time_values = _find_dimension(buffers.observation_dimensions, TIME_DIMENSION, 0)
+    currency_position, currency_values = _find_dimension(
+        buffers.series_dimensions, CURRENCY_DIMENSION, 1
+    )
+
+    time_periods = np.array(time_values, dtype=object)
+    currency_lookup = np.array(currency_values, dtype=object)
+    series_currency_index = np.array(
+        [int(key.split(':')[currency_position]) for key in buffers.series_keys],
+        dtype=np.intp
+    )
+
+    return SdmxStructure(time_periods, currency_lookup[series_currency_index])
+
+
+def parse_sdmx_json(stream, base_currency: str) -> pd.DataFrame:
+    """
+    Parse an ECB SDMX-JSON payload into a base rates DataFrame.
+
+    Args:
+        stream: File-like object returning the raw JSON bytes.
+        base_currency: Currency the ECB quotes against (EUR).
+    Returns:
+        A pandas DataFrame with exchange_date, base_currency, quote_currency and rate.
+    """
+    buffers = stream_sdmx_observations(stream)
+    structure = decode_sdmx_structure(buffers)
+
+    time_index = np.frombuffer(buffers.time_index, dtype=buffers.time_index.typecode)
+    series_index = np.frombuffer(buffers.series_index, dtype=buffers.series_index.typecode)
+
+    return pd.DataFrame({
+        'exchange_date': structure.time_periods.take(time_index),
+        'base_currency': base_currency,
+        'quote_currency': structure.series_currency.take(series_index),
+        'rate': np.frombuffer(buffers.rate, dtype=buffers.rate.typecode),
+    })
+
+
+def parse_sdmx_csv(stream, base_currency: str) -> pd.DataFrame:
+    """
+    Parse an ECB SDMX-CSV payload (format=csvdata) into a base rates DataFrame.
+
+    The payload is read with pyarrow's multithreaded CSV reader, keeping only
+    the TIME_PERIOD, CURRENCY and OBS_VALUE columns.
+
+    Args:
+        stream: File-like object returning the raw CSV bytes.
+        base_currency: Currency the ECB quotes against (EUR).
+    Returns:
+        A pandas DataFrame with exchange_date, base_currency, quote_currency and rate.
+    """
+    table = pa_csv.read_csv(
+        stream,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=[TIME_DIMENSION, CURRENCY_DIMENSION, OBS_VALUE_COLUMN],
+            column_types={
+                TIME_DIMENSION: pa.string(),
+                CURRENCY_DIMENSION: pa.string(),
+                OBS_VALUE_COLUMN: pa.float64(),
+            },
+        ),
+    )
+    table = table.filter(table[OBS_VALUE_COLUMN].is_valid())
+
+    return pd.DataFrame({
+        'exchange_date': table[TIME_DIMENSION].to_numpy(zero_copy_only=False),
+        'base_currency': base_currency,
+        'quote_currency': table[CURRENCY_DIMENSION].to_numpy(zero_copy_only=False),
+        'rate': table[OBS_VALUE_COLUMN].to_numpy(),
+    })
@@ -0,0 +1,407 @@
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from datetime import date
+from typing import TYPE_CHECKING
+
+from cloud_functions.utils.commons import load_to_bigquery
+from cloud_functions.utils.cross_rates import CROSS_RATE_VIEW_BUILDERS, FACT_MODEL_TABLES, get_fact_model
+from cloud_functions.utils.instrumentation import instrumented_stage
+from cloud_functions.utils.watermarks import BigQueryWatermarkSource, LocalWatermarkSource
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FX_SINKS = ('bigquery', 'duckdb', 'parquet', 'memory')
+
+_memory_sink = None
+_memory_sink_lock = threading.Lock()
+
+
+def iter_date_batches(df_fact: pd.DataFrame, max_rows: int):
+    """
+    Split a fact batch into consecutive slices of whole exchange dates with
+    at most `max_rows` rows each (a single date larger than `max_rows` is
+    still kept in one slice), so partition-level write modes stay correct.
+
+    Args:
+        df_fact: DataFrame with the fact_exchange_rates structure.
+        max_rows: Target maximum rows per slice.
+    Yields:
+        DataFrame slices in exchange_date order.
+    """
+    if len(df_fact) <= max_rows:
+        yield df_fact
+        return
+
+    import numpy as np
+    import pandas as pd
+
+    if not df_fact['exchange_date'].is_monotonic_increasing:
+        df_fact = df_fact.sort_values('exchange_date', kind='stable')
+
+    dates = df_fact['exchange_date']
+    if isinstance(dates.dtype, pd.CategoricalDtype):
+        dates = dates.cat.codes
+    dates = dates.to_numpy()
+    # Fin (exclusivo) de las filas de cada fecha.
+    date_ends = np.append(np.flatnonzero(dates[1:] != dates[:-1]) + 1, len(dates))
+
+    start = 0
+    while start < len(dates):
+        # Última fecha que cabe en max_rows, y al menos la fecha que empieza en `start`.
+        position = max(np.searchsorted(date_ends, start + max_rows, side='right') - 1,
+                       np.searchsorted(date_ends, start, side='right'))
+        end = date_ends[position]
+        yield df_fact.iloc[start:end]
+        start = end
+
+
+class BigQuerySink:
+    """
+    Loads fact batches into the BigQuery table with load_to_bigquery.
+
+    With `cross_rate_view_full_id` (compact or triangular model), the batches
+    hold only the stored subset of pairs and the view that exposes every pair
+    is created over the table before the first load of the process.
+
+    Batches larger than BIGQUERY_LOAD_BATCH_ROWS rows are loaded as several
+    load jobs of whole exchange dates, which bounds the Arrow table and
+    Parquet buffer built for each job.
+    """
+
+    def __init__(self, project_id: str, table_full_id: str, write_mode: str = None,
+                 cross_rate_view_full_id: str = None, fact_model: str = 'full'):
+        self.project_id = project_id
+        self.table_full_id = table_full_id
+        self.write_mode = write_mode
+        self.cross_rate_view_full_id = cross_rate_view_full_id
+        self.fact_model = fact_model
+
+    @classmethod
+    def from_env(cls) -> 'BigQuerySink':
+        PROJECT_ID = os.getenv("GCP_PROJECT_ID")
+        DATASET_ID = os.getenv("BIGQUERY_DATASET_ID")
+        TABLE_ID = os.getenv("BIGQUERY_TABLE_ID")
+
+        if not all([PROJECT_ID, DATASET_ID, TABLE_ID]):
+            raise ValueError("Faltan variables de entorno (GCP_PROJECT_ID, BIGQUERY_DATASET_ID, BIGQUERY_TABLE_ID). Asegúrate de que .env está cargado o configurado en Cloud Function.")
+
+        fact_model = get_fact_model()
+        if fact_model in FACT_MODEL_TABLES:
+            # BIGQUERY_TABLE_ID pasa a ser la vista de tipos cruzados que leen las consultas existentes.
+            STORED_TABLE_ID = os.getenv(*FACT_MODEL_TABLES[fact_model])
+            return cls(PROJECT_ID, f"{PROJECT_ID}.{DATASET_ID}.{STORED_TABLE_ID}",
+                       cross_rate_view_full_id=f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}", fact_model=fact_model)
+
+        return cls(PROJECT_ID, f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}")
+
+    @property
+    def replaces_dates(self) -> bool:
+        # partition_overwrite reemplaza la partición entera; append y merge trabajan por filas.
+        return (self.write_mode or os.getenv("BIGQUERY_WRITE_MODE", "append")) == 'partition_overwrite'
+
+    def load(self, df_fact: pd.DataFrame) -> dict:
+        if self.cross_rate_view_full_id and not df_fact.empty:
+            from cloud_functions.utils.bigquery_client import get_bigquery_client
+            from cloud_functions.utils.cross_rates import ensure_bigquery_cross_rate_view
+
+            try:
+                ensure_bigquery_cross_rate_view(
+                    get_bigquery_client(self.project_id), self.cross_rate_view_full_id, self.table_full_id,
+                    self.fact_model,
+                )
+            except Exception as e:
+                error_msg = f"Error al crear la vista de tipos cruzados {self.cross_rate_view_full_id}: {e}"
+                print(error_msg)
+                return {"status": "error", "message": error_msg}
+
+        max_rows = int(os.getenv("BIGQUERY_LOAD_BATCH_ROWS", "1000000"))
+        result = None
+        for batch in iter_date_batches(df_fact, max_rows):
+            batch_result = load_to_bigquery(batch, self.project_id, self.table_full_id, self.write_mode)
+            result = batch_result if result is None else _merge_load_results(result, batch_result)
+            if result['status'] == 'error':
+                break
+        return result
+
+    def loaded_dates(self, start_date: str, end_date: str) -> set[date]:
+        return BigQueryWatermarkSource(self.project_id, self.table_full_id).loaded_dates(start_date, end_date)
+
+    def loaded_row_counts(self, start_date: str, end_date: str) -> dict[date, int]:
+        return BigQueryWatermarkSource(self.project_id, self.table_full_id).loaded_row_counts(start_date, end_date)
+
+    def loaded_currencies(self, dates: set[date]) -> dict[date, set[str]]:
+        return BigQueryWatermarkSource(self.project_id, self.table_full_id).loaded_currencies(dates)
+
+
+def _merge_load_results(total: dict, batch: dict) -> dict:
+    # Suma los contadores de cada lote; el estado es el del último lote cargado.
+    merged = {**total, **batch}
+    for key in ('rows_inserted', 'rows_updated', 'partitions_replaced'):
+        if key in total or key in batch:
+            merged[key] = total.get(key, 0) + batch.get(key, 0)
+    return merged
+
+
+class DuckDBSink:
+    """
+    Loads fact batches into a local DuckDB database file. Each batch replaces
+    the rows of its exchange dates in one transaction, so re-runs are idempotent.
+    With `cross_rate_view` (compact or triangular model), the table holds the
+    stored subset of pairs and the view derives every pair from it.
+    Requires the optional `duckdb` package.
+    """
+
+    replaces_dates = True
+
+    def __init__(self, path: str, table: str = 'fact_exchange_rates', cross_rate_view: str = None,
+                 fact_model: str = 'full'):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("El sink 'duckdb' requiere el paquete opcional duckdb (pip install duckdb).") from e
+
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._connection = duckdb.connect(path)
+        self._connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                exchange_date DATE NOT NULL,
+                base_currency VARCHAR NOT NULL,
+                quote_currency VARCHAR NOT NULL,
+                rate DOUBLE NOT NULL,
+                rate_inverse DOUBLE,
+                data_source VARCHAR,
+                load_timestamp TIMESTAMP NOT NULL
+            )
+        """)
+        if cross_rate_view:
+            self._connection.execute(CROSS_RATE_VIEW_BUILDERS[fact_model](cross_rate_view, table))
+
+    @instrumented_stage('load')
+    def load(self, df_fact: pd.DataFrame) -> dict:
+        if df_fact.empty:
+            return {"status": "skipped", "message": "DataFrame is empty."}
+
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.register('batch', df_fact)
+            try:
+                cursor.execute("BEGIN TRANSACTION")
+                cursor.execute(f"DELETE FROM {self.table} WHERE exchange_date IN (SELECT DISTINCT CAST(exchange_date AS DATE) FROM batch)")
+                cursor.execute(f"""
+                    INSERT INTO {self.table}
+                    SELECT CAST(exchange_date AS DATE), base_currency, quote_currency, rate, rate_inverse,
+                           data_source, CAST(load_timestamp AS TIMESTAMP)
+                    FROM batch
+                """)
+                cursor.execute("COMMIT")
+            except Exception as e:
+                cursor.execute("ROLLBACK")
+                error_msg = f"Error fatal durante la carga en DuckDB: {e}"
+                print(error_msg)
+                return {"status": "error", "message": error_msg}
+            finally:
+                cursor.close()
+
+        print(f"Carga exitosa en DuckDB ({self.path}). Filas insertadas: {len(df_fact)}.")
+        return {
+            "status": "success",
+            "message": "Data successfully loaded to DuckDB.",
+            "rows_inserted": len(df_fact),
+            "destination_table": f"{self.path}:{self.table}"
+        }
+
+    def loaded_dates(self, start_date: str, end_date: str) -> set[date]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT DISTINCT exchange_date FROM {self.table} WHERE exchange_date BETWEEN ? AND ?",
+                [start_date, end_date],
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def loaded_row_counts(self, start_date: str, end_date: str) -> dict[date, int]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT exchange_date, count(*) FROM {self.table} WHERE exchange_date BETWEEN ? AND ? GROUP BY exchange_date",
+                [start_date, end_date],
+            ).fetchall()
+        return dict(rows)
+
+    def loaded_currencies(self, dates: set[date]) -> dict[date, set[str]]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"""
+                SELECT DISTINCT exchange_date, unnest([base_currency, quote_currency])
+                FROM {self.table} WHERE list_contains(?, exchange_date)
+                """,
+                [sorted(dates)],
+            ).fetchall()
+        currencies = {}
+        for exchange_date, currency in rows:
+            currencies.setdefault(exchange_date, set()).add(currency)
+        return currencies
+
+
+class ParquetSink:
+    """
+    Writes fact batches as a Hive-partitioned Parquet dataset
+    (`<directory>/exchange_date=YYYY-MM-DD/*.parquet`) with the same explicit
+    schema used for BigQuery loads. Partitions in a batch are replaced.
+    """
+
+    replaces_dates = True
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @instrumented_stage('load')
+    def load(self, df_fact: pd.DataFrame) -> dict:
+        if df_fact.empty:
+            return {"status": "skipped", "message": "DataFrame is empty."}
+
+        import pyarrow.dataset as ds
+
+        from cloud_functions.utils.load_strategies import build_fact_arrow_table
+
+        try:
+            ds.write_dataset(
+                build_fact_arrow_table(df_fact),
+                self.directory,
+                format='parquet',
+                partitioning=['exchange_date'],
+                partitioning_flavor='hive',
+                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                existing_data_behavior='delete_matching',
+            )
+        except Exception as e:
+            error_msg = f"Error fatal durante la escritura Parquet: {e}"
+            print(error_msg)
+            return {"status": "error", "message": error_msg}
+
+        print(f"Escritura Parquet completada en {self.directory}. Filas escritas: {len(df_fact)}.")
+        return {
+            "status": "success",
+            "message": "Data successfully written to Parquet.",
+            "rows_inserted": len(df_fact),
+            "destination_table": self.directory
+        }
+
+    def loaded_dates(self, start_date: str, end_date: str) -> set[date]:
+        prefix = 'exchange_date='
+        with os.scandir(self.directory) as it:
+            partitions = [entry.name[len(prefix):] for entry in it if entry.is_dir() and entry.name.startswith(prefix)]
+        return LocalWatermarkSource(partitions).loaded_dates(start_date, end_date)
+
+    def _partition_files(self, day: date) -> list[str]:
+        partition = os.path.join(self.directory, f"exchange_date={day.isoformat()}")
+        return [entry.path for entry in os.scandir(partition) if entry.name.endswith('.parquet')]
+
+    def loaded_row_counts(self, start_date: str, end_date: str) -> dict[date, int]:
+        import pyarrow.parquet as pq
+
+        # Solo los pies de página de los ficheros: no se leen datos.
+        return {
+            day: sum(pq.read_metadata(path).num_rows for path in self._partition_files(day))
+            for day in self.loaded_dates(start_date, end_date)
+        }
+
+    def loaded_currencies(self, dates: set[date]) -> dict[date, set[str]]:
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        currencies = {}
+        for day in dates:
+            table = pq.read_table(os.path.join(self.directory, f"exchange_date={day.isoformat()}"),
+                                  columns=['base_currency', 'quote_currency'])
+            currencies[day] = {c for column in table.columns for c in pc.unique(column).to_pylist()}
+        return currencies
+
+
+class MemorySink:
+    """
+    Records every loaded batch in memory (tests, load tests and local runs).
+    """
+
+    replaces_dates = False
+
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    @instrumented_stage('load')
+    def load(self, df_fact: pd.DataFrame) -> dict:
+        if df_fact.empty:
+            return {"status": "skipped", "message": "DataFrame is empty."}
+        with self._lock:
+            self.batches.append(df_fact.copy())
+        return {
+            "status": "success",
+            "message": "Data recorded in memory.",
+            "rows_inserted": len(df_fact),
+            "destination_table": "memory"
+        }
+
+    def loaded_dates(self, start_date: str, end_date: str) -> set[date]:
+        with self._lock:
+            dates = {d for batch in self.batches for d in batch['exchange_date'].unique()}
+        return LocalWatermarkSource(dates).loaded_dates(start_date, end_date)
+
+    def loaded_row_counts(self, start_date: str, end_date: str) -> dict[date, int]:
+        row_counts = {}
+        with self._lock:
+            for batch in self.batches:
+                for exchange_date, rows in batch['exchange_date'].value_counts().items():
+                    if rows:
+                        day = date.fromisoformat(str(exchange_date))
+                        row_counts[day] = row_counts.get(day, 0) + rows
+        return LocalWatermarkSource(row_counts, row_counts=row_counts).loaded_row_counts(start_date, end_date)
+
+    def loaded_currencies(self, dates: set[date]) -> dict[date, set[str]]:
+        currencies = {}
+        with self._lock:
+            for batch in self.batches:
+                for column in ('base_currency', 'quote_currency'):
+                    rows = batch[['exchange_date', column]].drop_duplicates()
+                    for exchange_date, currency in zip(rows['exchange_date'], rows[column]):
+                        currencies.setdefault(date.fromisoformat(str(exchange_date)), set()).add(currency)
+        return LocalWatermarkSource(currencies, currencies).loaded_currencies(dates)
+
+
+def get_sink():
+    """
+    Return the load destination selected by FX_SINK.
+
+    Returns:
+        A BigQuerySink ('bigquery', default, configured from GCP_PROJECT_ID,
+        BIGQUERY_DATASET_ID and BIGQUERY_TABLE_ID), a DuckDBSink ('duckdb',
+        FX_DUCKDB_PATH), a ParquetSink ('parquet', FX_PARQUET_DIR) or the
+        process-wide MemorySink ('memory'). With FX_FACT_MODEL=compact or
+        triangular the BigQuery and DuckDB sinks load the stored subset of
+        pairs and serve every pair from a view; the Parquet and memory sinks
+        store the subset as is.
+    """
+    global _memory_sink
+    sink = os.getenv("FX_SINK", "bigquery")
+    if sink == 'bigquery':
+        return BigQuerySink.from_env()
+    if sink == 'duckdb':
+        fact_model = get_fact_model()
+        if fact_model in FACT_MODEL_TABLES:
+            return DuckDBSink(os.getenv("FX_DUCKDB_PATH", "fx.duckdb"), FACT_MODEL_TABLES[fact_model][1],
+                              cross_rate_view='fact_exchange_rates', fact_model=fact_model)
+        return DuckDBSink(os.getenv("FX_DUCKDB_PATH", "fx.duckdb"))
+    if sink == 'parquet':
+        return ParquetSink(os.getenv("FX_PARQUET_DIR", "fx_parquet"))
+    if sink == 'memory':
+        if _memory_sink is None:
+            with _memory_sink_lock:
+                if _memory_sink is None:
+                    _memory_sink = MemorySink()
+        return _memory_sink
+    raise ValueError(f"Sink no soportado: {sink}. Opciones: {FX_SINKS}")
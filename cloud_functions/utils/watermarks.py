@@ -0,0 +1,259 @@
+import os
+from datetime import date, timedelta
+
+
+def _easter_sunday(year: int) -> date:
+    # Algoritmo anónimo gregoriano (Meeus/Jones/Butcher).
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def target_holidays(year: int) -> set[date]:
+    """
+    TARGET2 closing days, on which the ECB publishes no reference rates.
+
+    Args:
+        year: Calendar year.
+    Returns:
+        The set of holiday dates for that year.
+    """
+    easter = _easter_sunday(year)
+    return {
+        date(year, 1, 1),
+        easter - timedelta(days=2),
+        easter + timedelta(days=1),
+        date(year, 5, 1),
+        date(year, 12, 25),
+        date(year, 12, 26),
+    }
+
+
+def business_dates(start: date, end: date) -> list[date]:
+    """
+    ECB publication days (weekdays that are not TARGET holidays) in [start, end].
+    """
+    holidays = set()
+    for year in range(start.year, end.year + 1):
+        holidays |= target_holidays(year)
+
+    days = []
+    current = start
+    while current <= end:
+        if current.weekday() < 5 and current not in holidays:
+            days.append(current)
+        current += timedelta(days=1)
+    return days
+
+
+def plan_missing_ranges(loaded_dates: set[date], start_date: str, end_date: str) -> list[tuple[str, str]]:
+    """
+    Compute the date ranges that still have to be fetched and loaded.
+
+    Missing business dates are grouped into ranges of consecutive publication
+    days, so a gap spanning a weekend is fetched with a single request.
+
+    Args:
+        loaded_dates: exchange_date values already present in the destination.
+        start_date: Start date in 'YYYY-MM-DD' format.
+        end_date: End date in 'YYYY-MM-DD' format.
+    Returns:
+        A list of (start_date, end_date) tuples in chronological order.
+    """
+    ranges = []
+    range_start = range_end = None
+    for day in business_dates(date.fromisoformat(start_date), date.fromisoformat(end_date)):
+        if day in loaded_dates:
+            if range_start is not None:
+                ranges.append((range_start.isoformat(), range_end.isoformat()))
+                range_start = None
+            continue
+        if range_start is None:
+            range_start = day
+        range_end = day
+
+    if range_start is not None:
+        ranges.append((range_start.isoformat(), range_end.isoformat()))
+    return ranges
+
+
+def read_watermarks(source, start_date: str, end_date: str, currencies: set[str] = None,
+                    rows_per_date: int = None) -> tuple[set[date], dict[date, set[str]]]:
+    """
+    Read which exchange dates of [start_date, end_date] the destination holds.
+
+    Planning reads the row count of every non-empty partition (metadata
+    only for BigQuery). Without `currencies` (the "*" universe, unknown in
+    advance) a non-empty partition counts as loaded. Otherwise the dates
+    with fewer rows than `rows_per_date` are candidates: only their
+    currencies are read, and they count as loaded when they cover every
+    expected currency. Adding a currency to FX_CURRENCIES or FX_PAIRS thus
+    plans the dates loaded before again; replacing a currency by another
+    leaves the row counts unchanged and is not detected.
+
+    Args:
+        source: Watermark source (see get_watermark_source).
+        start_date: Start date in 'YYYY-MM-DD' format.
+        end_date: End date in 'YYYY-MM-DD' format.
+        currencies: Currencies every loaded date is expected to hold (see
+            commons.get_stored_currencies), or None.
+        rows_per_date: Rows a date holds when every expected currency is
+            quoted (see commons.count_stored_pairs).
+    Returns:
+        A tuple (loaded_dates, loaded_currencies): the complete dates, and the
+        currencies present on every candidate date ({} when there is none).
+    """
+    if currencies is None:
+        return source.loaded_dates(start_date, end_date), {}
+    row_counts = source.loaded_row_counts(start_date, end_date)
+    candidates = {day for day, rows in row_counts.items() if rows < rows_per_date}
+    loaded_currencies = source.loaded_currencies(candidates) if candidates else {}
+    incomplete = {day for day in candidates if not currencies <= loaded_currencies.get(day, set())}
+    return set(row_counts) - incomplete, loaded_currencies
+
+
+def drop_loaded_dates(df_fact, loaded_dates: set[date], loaded_currencies: dict[date, set[str]] = None):
+    """
+    Remove the rows that are already loaded.
+
+    Args:
+        df_fact: DataFrame with 'exchange_date' ('YYYY-MM-DD'), 'base_currency'
+            and 'quote_currency' columns.
+        loaded_dates: exchange_date values already complete in the destination.
+        loaded_currencies: Currencies present on each non-empty date (see
+            read_watermarks). On the dates that are not complete, only the
+            pairs with a currency missing on that date are kept, so appending
+            them never duplicates a stored pair. Leave it out for sinks that
+            replace whole dates (see the sinks' `replaces_dates`).
+    Returns:
+        The DataFrame restricted to the rows that are not loaded yet.
+    """
+    partial = {
+        day.isoformat(): present for day, present in (loaded_currencies or {}).items()
+        if present and day not in loaded_dates
+    }
+    if not loaded_dates and not partial:
+        return df_fact
+
+    exchange_dates = df_fact['exchange_date'].astype(str)
+    keep = ~exchange_dates.isin({d.isoformat() for d in loaded_dates}).to_numpy()
+    if partial:
+        import pandas as pd
+
+        stored = pd.MultiIndex.from_tuples([(day, c) for day, present in partial.items() for c in present])
+        in_partial = exchange_dates.isin(partial).to_numpy()
+        dates = exchange_dates[in_partial]
+        base_stored = pd.MultiIndex.from_arrays([dates, df_fact['base_currency'][in_partial].astype(str)]).isin(stored)
+        quote_stored = pd.MultiIndex.from_arrays([dates, df_fact['quote_currency'][in_partial].astype(str)]).isin(stored)
+        keep[in_partial] = ~(base_stored & quote_stored)
+    return df_fact[keep].reset_index(drop=True)
+
+
+class LocalWatermarkSource:
+    """
+    In-memory stand-in for the loaded partitions of the fact table (tests and
+    local runs). `row_counts` and `currencies` optionally map each loaded
+    date to its number of rows and to the currencies present on it.
+    """
+
+    def __init__(self, loaded_dates=(), currencies: dict = None, row_counts: dict = None):
+        self.dates = {date.fromisoformat(str(d)) for d in loaded_dates}
+        self.currencies = {date.fromisoformat(str(d)): set(c) for d, c in (currencies or {}).items()}
+        self.row_counts = {date.fromisoformat(str(d)): n for d, n in (row_counts or {}).items()}
+
+    def loaded_dates(self, start_date: str, end_date: str) -> set[date]:
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+        return {d for d in self.dates if start <= d <= end}
+
+    def loaded_row_counts(self, start_date: str, end_date: str) -> dict[date, int]:
+        return {d: self.row_counts.get(d, 0) for d in self.loaded_dates(start_date, end_date)}
+
+    def loaded_currencies(self, dates: set[date]) -> dict[date, set[str]]:
+        return {d: self.currencies.get(d, set()) for d in dates if d in self.dates}
+
+
+class BigQueryWatermarkSource:
+    """
+    Reads the non-empty `exchange_date` partitions of a date-partitioned table
+    and their row counts from INFORMATION_SCHEMA.PARTITIONS, a metadata query
+    that scans no table data. Only loaded_currencies reads table data, for the
+    candidate dates that read_watermarks passes to it. Queries go through the
+    REST API (see bigquery_client.run_bigquery_query), so planning a run does
+    not import google.cloud.bigquery.
+    """
+
+    def __init__(self, project_id: str, table_full_id: str):
+        self.project_id = project_id
+        self.table_full_id = table_full_id
+
+    def loaded_dates(self, start_date: str, end_date: str) -> set[date]:
+        return set(self.loaded_row_counts(start_date, end_date))
+
+    def loaded_row_counts(self, start_date: str, end_date: str) -> dict[date, int]:
+        from cloud_functions.utils.bigquery_client import run_bigquery_query
+
+        project, dataset, table = self.table_full_id.split('.')
+        query = f"""
+            SELECT partition_id, total_rows
+            FROM `{project}.{dataset}.INFORMATION_SCHEMA.PARTITIONS`
+            WHERE table_name = @table_name
+              AND total_rows > 0
+              AND partition_id BETWEEN @start_partition AND @end_partition
+        """
+        rows = run_bigquery_query(self.project_id, query, [
+            ('table_name', 'STRING', table),
+            ('start_partition', 'STRING', start_date.replace('-', '')),
+            ('end_partition', 'STRING', end_date.replace('-', '')),
+        ])
+        return {
+            date(int(p[:4]), int(p[4:6]), int(p[6:8])): row['total_rows']
+            for row in rows
+            if (p := row['partition_id']).isdigit()
+        }
+
+    def loaded_currencies(self, dates: set[date]) -> dict[date, set[str]]:
+        # Única consulta que lee datos de la tabla: base_currency y quote_currency
+        # de las particiones candidatas (el BETWEEN permite podar el resto).
+        from cloud_functions.utils.bigquery_client import run_bigquery_query
+
+        query = f"""
+            SELECT exchange_date, ARRAY_AGG(DISTINCT currency) AS currencies
+            FROM `{self.table_full_id}`, UNNEST([base_currency, quote_currency]) AS currency
+            WHERE exchange_date BETWEEN @start_date AND @end_date
+              AND exchange_date IN UNNEST(@dates)
+            GROUP BY exchange_date
+        """
+        rows = run_bigquery_query(self.project_id, query, [
+            ('start_date', 'DATE', min(dates).isoformat()),
+            ('end_date', 'DATE', max(dates).isoformat()),
+            ('dates', 'DATE', sorted(d.isoformat() for d in dates)),
+        ])
+        return {row['exchange_date']: set(row['currencies']) for row in rows}
+
+
+def get_watermark_source(sink):
+    """
+    Return the watermark source selected by FX_WATERMARK_SOURCE.
+
+    Args:
+        sink: Load destination (see sinks.get_sink); every sink exposes
+            loaded_dates(), loaded_row_counts() and loaded_currencies().
+    Returns:
+        The sink itself ('sink', default; 'bigquery' is accepted for existing
+        configurations), or an empty LocalWatermarkSource ('none'), which makes
+        every date count as missing.
+    """
+    source = os.getenv("FX_WATERMARK_SOURCE", "sink")
+    if source == 'none':
+        return LocalWatermarkSource()
+    if source not in ('sink', 'bigquery'):
+        raise ValueError(f"Fuente de watermark no soportada: {source}")
+    return sink
@@ -1,67 +1,191 @@
 import os
 import functions_framework
 
-from cloud_functions.fetch_ecb_data_for_ytd.main import etl_fx_function
-from cloud_functions.utils.commons import load_to_bigquery
-from datetime import date
+from cloud_functions.fetch_ecb_data_for_ytd.main import EXTRACTION_ENGINES, etl_fx_function, etl_fx_pipelined
+from cloud_functions.utils.backfill import plan_date_chunks
+from cloud_functions.utils.commons import count_stored_pairs, get_stored_currencies
+from cloud_functions.utils.cross_rates import get_fact_model
+from cloud_functions.utils.ecb_state import commit_ecb_state
+from cloud_functions.utils.instrumentation import collect_stage_metrics
+from cloud_functions.utils.pipeline import get_executor
+from cloud_functions.utils.sinks import get_sink
+from cloud_functions.utils.watermarks import (
+    drop_loaded_dates,
+    get_watermark_source,
+    plan_missing_ranges,
+    read_watermarks,
+)
+from datetime import date, timedelta
 
 @functions_framework.http
 def etl_fx_load_all_year_data_function(request):
     """
-    Cloud Funtion that loads the full YTD data into BigQuery.
+    Cloud Funtion that loads the full YTD data into BigQuery (or the FX_SINK destination).
+    A historical backfill can be requested with the optional `start_date`,
+    `end_date` (YYYY-MM-DD), `chunk` ('year' or 'month') and `engine`
+    ('threads' or 'async') query parameters. Only the business dates that are
+    not yet loaded in the destination table (or that lack a currency of the
+    configured universe and pairs) are fetched and loaded, in blocks
+    of FX_TRANSFORM_BLOCK_DAYS exchange dates that are transformed and loaded
+    one after another. With `executor=pipelined` (or FX_EXECUTOR), the chunks
+    are downloaded, transformed and loaded concurrently through bounded queues.
+    The response body includes the metrics of every extract, transform and
+    load stage under `stages`.
     """
-    # 1. Extraction YTD
+    with collect_stage_metrics() as stages:
+        body, status_code = _load_requested_range(request)
+    body["stages"] = stages
+    return body, status_code
+
+def _load_requested_range(request):
+    # 1. Extraction YTD (o el rango solicitado)
     current_year = date.today().year
-    start_date = f"{current_year}-01-01"
-    end_date = date.today().strftime("%Y-%m-%d")
-    df_fact = etl_fx_function(start_date, end_date)
+    args = request.args if request is not None else {}
+    start_date = args.get("start_date", f"{current_year}-01-01")
+    end_date = args.get("end_date", date.today().strftime("%Y-%m-%d"))
 
-    if df_fact.empty:
-        return {"status": "success", "message": "No se encontraron datos para transformar."}, 200
+    chunk = args.get("chunk") or os.getenv("ECB_BACKFILL_CHUNK", "year")
+    engine = args.get("engine") or os.getenv("ECB_EXTRACTION_ENGINE", "threads")
 
-    # 2. Load (L)
-    PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-    DATASET_ID = os.getenv("BIGQUERY_DATASET_ID")
-    TABLE_ID = os.getenv("BIGQUERY_TABLE_ID")
+    try:
+        plan_date_chunks(start_date, end_date, chunk)
+        if engine not in EXTRACTION_ENGINES:
+            raise ValueError(f"Motor de extracción no soportado: {engine}.")
+        executor = get_executor(args.get("executor"))
+        fact_model = get_fact_model()
+        currencies = get_stored_currencies(fact_model)
+        rows_per_date = count_stored_pairs(fact_model)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}, 400
 
-    if not all([PROJECT_ID, DATASET_ID, TABLE_ID]):
-        raise ValueError("Faltan variables de entorno (GCP_PROJECT_ID, BIGQUERY_DATASET_ID, BIGQUERY_TABLE_ID). Asegúrate de que .env está cargado o configurado en Cloud Function.")
+    sink = get_sink()
 
-    BIGQUERY_TABLE_FULL_ID = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}"
-    
-    load_result = load_to_bigquery(df_fact, PROJECT_ID, BIGQUERY_TABLE_FULL_ID) 
-    
-    if load_result['status'] == 'success':
-         return {"status": "success", "message": f"ETL finalizado: {load_result['rows_inserted']} filas cargadas en BigQuery."}, 200
+    loaded_dates, loaded_currencies = read_watermarks(
+        get_watermark_source(sink), start_date, end_date, currencies, rows_per_date
+    )
+    if sink.replaces_dates:
+        # Una fecha incompleta se reemplaza entera: se vuelven a cargar todos sus pares.
+        loaded_currencies = {}
+    missing_ranges = plan_missing_ranges(loaded_dates, start_date, end_date)
+
+    if not missing_ranges:
+        return {"status": "success", "message": f"Todas las fechas entre {start_date} y {end_date} ya están cargadas."}, 200
+
+    print(f"Rangos pendientes de carga: {missing_ranges}")
+
+    # Bloques de fechas transformados y cargados uno a uno: memoria acotada en backfills largos.
+    # En pipeline cada bloque (year/month) ya acota la memoria y se carga entero por defecto.
+    block_days = int(os.getenv("FX_TRANSFORM_BLOCK_DAYS", "0" if executor == 'pipelined' else "250"))
+
+    def load_block(df_fact):
+        # 2. Load (L)
+        return sink.load(drop_loaded_dates(df_fact, loaded_dates, loaded_currencies))
+
+    if executor == 'pipelined':
+        load_results, error = etl_fx_pipelined(missing_ranges, load_block, chunk=chunk, block_days=block_days)
+        if isinstance(error, tuple):
+            return error
+        if error is not None:
+            return {"status": "error", "message": error['message']}, 500
     else:
-         return {"status": "error", "message": load_result['message']}, 500
+        load_results = _load_sequentially(missing_ranges, load_block, chunk, engine, block_days)
+        if isinstance(load_results, tuple):
+            return load_results
+
+    rows_inserted = sum(load_result.get('rows_inserted', 0) for load_result in load_results)
+    rows_updated = sum(load_result.get('rows_updated', 0) for load_result in load_results)
+
+    if not rows_inserted and not rows_updated:
+        return {"status": "success", "message": "No se encontraron datos para transformar."}, 200
+
+    return {
+        "status": "success",
+        "message": f"ETL finalizado: {rows_inserted} filas cargadas ({rows_updated} actualizadas).",
+        "rows_inserted": rows_inserted,
+        "rows_updated": rows_updated
+    }, 200
+
+def _load_sequentially(missing_ranges, load_block, chunk, engine, block_days):
+    load_results = []
+    for range_start, range_end in missing_ranges:
+        fact_blocks = etl_fx_function(range_start, range_end, chunk=chunk, engine=engine, block_days=block_days)
+
+        if isinstance(fact_blocks, tuple):
+            return fact_blocks
+
+        if fact_blocks is None:
+            continue
+
+        if not block_days:
+            # FX_TRANSFORM_BLOCK_DAYS=0: todo el rango en un único bloque.
+            fact_blocks = [fact_blocks]
+
+        for df_fact in fact_blocks:
+            if df_fact.empty:
+                continue
+
+            load_result = load_block(df_fact)
+
+            if load_result['status'] == 'error':
+                return {"status": "error", "message": load_result['message']}, 500
+            load_results.append(load_result)
+
+    return load_results
 
 @functions_framework.cloud_event
 def update_today_ebc_data_function(cloudevent):
     """
-    Cloud function that updates today's ECB data into Bigquery.
+    Cloud function that updates today's ECB data into Bigquery (or the FX_SINK destination).
+    Business dates missing in the last FX_CATCHUP_DAYS days (e.g. after an
+    outage) are recovered with one catch-up request. Runs with no missing
+    business dates (weekends, TARGET holidays, retries) exit after a watermark
+    query on the destination, before the ECB is called. Otherwise the ECB is
+    queried with a conditional request from the first missing date, so a run
+    where nothing new has been published exits without importing pandas.
     """
-    # 1. Extraction Todays data
-    today_date = date.today().strftime("%Y-%m-%d")
-    df_fact = etl_fx_function(today_date, today_date)
+    sink = get_sink()
 
-    if df_fact.empty:
-        print("INFO: No se encontraron datos para transformar.")
+    # 1. Plan: fechas hábiles sin cargar en la ventana de recuperación
+    today = date.today()
+    window_start = (today - timedelta(days=int(os.getenv("FX_CATCHUP_DAYS", "7")))).isoformat()
+    today_date = today.isoformat()
+
+    fact_model = get_fact_model()
+    loaded_dates, loaded_currencies = read_watermarks(
+        get_watermark_source(sink), window_start, today_date,
+        get_stored_currencies(fact_model), count_stored_pairs(fact_model),
+    )
+    if sink.replaces_dates:
+        loaded_currencies = {}
+    missing_ranges = plan_missing_ranges(loaded_dates, window_start, today_date)
+
+    if not missing_ranges:
+        print("INFO: Todas las fechas hábiles ya están cargadas. No hay nada que hacer.")
         return
 
-    # 2. Load (L)
-    PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-    DATASET_ID = os.getenv("BIGQUERY_DATASET_ID")
-    TABLE_ID = os.getenv("BIGQUERY_TABLE_ID")
+    # 2. Extraction: una única petición condicional desde la primera fecha pendiente
+    catchup_start = missing_ranges[0][0]
+    df_fact = etl_fx_function(catchup_start, today_date, conditional=True)
+
+    if df_fact is None:
+        print("INFO: El BCE no ha publicado datos nuevos. No hay nada que cargar.")
+        return
+
+    if isinstance(df_fact, tuple):
+        raise RuntimeError(f"FALLO en la extracción: {df_fact[0]['message']}")
+
+    df_fact = drop_loaded_dates(df_fact, loaded_dates, loaded_currencies)
+
+    if df_fact.empty:
+        print("INFO: Todas las fechas recibidas ya están cargadas. No hay nada que hacer.")
+        commit_ecb_state()
+        return
 
-    if not all([PROJECT_ID, DATASET_ID, TABLE_ID]):
-        raise ValueError("Faltan variables de entorno para BigQuery.")
+    # 3. Load (L)
+    load_result = sink.load(df_fact)
 
-    BIGQUERY_TABLE_FULL_ID = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}"
-    
-    load_result = load_to_bigquery(df_fact, PROJECT_ID, BIGQUERY_TABLE_FULL_ID) 
-    
     if load_result['status'] == 'success':
-        print(f"ÉXITO: ETL finalizado: {load_result['rows_inserted']} filas cargadas.")
+        commit_ecb_state()
+        print(f"ÉXITO: ETL finalizado: {load_result['rows_inserted']} filas cargadas, {load_result.get('rows_updated', 0)} actualizadas.")
     else:
-        raise RuntimeError(f"FALLO en la carga: {load_result['message']}")
\ No newline at end of file
+        raise RuntimeError(f"FALLO en la carga: {load_result['message']}")
@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cloud_functions.utils.commons import build_pair_rates, transform_to_fact_table
+
+CURRENCIES = ['EUR', 'USD', 'NOK', 'SEK']
+
+# EUR/X del BCE: SEK a 0 el 2 de enero y NOK sin fijar (NaN) el 3 de enero.
+BASE_RATES = {
+    '2024-01-02': {'EUR': 1.0, 'USD': 1.1, 'NOK': 11.5, 'SEK': 0.0},
+    '2024-01-03': {'EUR': 1.0, 'USD': 1.2, 'NOK': math.nan, 'SEK': 11.0},
+}
+
+
+@pytest.fixture
+def df_base_rates(monkeypatch):
+    monkeypatch.setenv('FX_CURRENCIES', ','.join(CURRENCIES))
+    return pd.DataFrame(
+        [(day, currency, rate) for day, rates in BASE_RATES.items() for currency, rate in rates.items()],
+        columns=['exchange_date', 'quote_currency', 'rate'],
+    )
+
+
+def _expected_rows(keep=lambda base, quote: True):
+    # Cálculo escalar de referencia: quote / base, 0.0 si la base es 0; inverso 0.0 si el tipo es 0.
+    rows = {}
+    for day, rates in BASE_RATES.items():
+        for base in CURRENCIES:
+            for quote in CURRENCIES:
+                if not keep(base, quote) or math.isnan(rates[base]) or math.isnan(rates[quote]):
+                    continue
+                rate = rates[quote] / rates[base] if rates[base] != 0 else 0.0
+                rows[(day, base, quote)] = (rate, 1 / rate if rate != 0 else 0.0)
+    return rows
+
+
+def _actual_rows(df_fact):
+    keys = zip(df_fact['exchange_date'].astype(str), df_fact['base_currency'].astype(str),
+               df_fact['quote_currency'].astype(str))
+    return dict(zip(keys, zip(df_fact['rate'], df_fact['rate_inverse'])))
+
+
+def _assert_rows(df_fact, expected):
+    actual = _actual_rows(df_fact)
+    assert actual.keys() == expected.keys()
+    for key, (rate, rate_inverse) in expected.items():
+        assert actual[key] == pytest.approx((rate, rate_inverse)), key
+
+
+def test_full_model_matches_scalar_rates(df_base_rates):
+    df_fact = transform_to_fact_table(df_base_rates)
+
+    _assert_rows(df_fact, _expected_rows())
+    actual = _actual_rows(df_fact)
+    assert actual[('2024-01-02', 'USD', 'NOK')] == pytest.approx((11.5 / 1.1, 1.1 / 11.5))
+    assert actual[('2024-01-02', 'SEK', 'USD')] == (0.0, 0.0)
+    assert actual[('2024-01-02', 'USD', 'SEK')] == (0.0, 0.0)
+    assert actual[('2024-01-03', 'EUR', 'EUR')] == (1.0, 1.0)
+
+
+def test_pairs_with_a_nan_rate_are_dropped(df_base_rates):
+    df_fact = transform_to_fact_table(df_base_rates)
+
+    on_jan_3 = df_fact[df_fact['exchange_date'] == '2024-01-03']
+    assert 'NOK' not in set(on_jan_3['base_currency']) | set(on_jan_3['quote_currency'])
+    assert len(df_fact) == 16 + 9
+    assert not df_fact[['rate', 'rate_inverse']].isna().any().any()
+
+
+def test_columns_are_categorical(df_base_rates):
+    df_fact = transform_to_fact_table(df_base_rates)
+
+    assert df_fact['exchange_date'].dtype == pd.CategoricalDtype(list(BASE_RATES), ordered=True)
+    assert df_fact['base_currency'].dtype == pd.CategoricalDtype(CURRENCIES)
+    assert df_fact['quote_currency'].dtype == pd.CategoricalDtype(CURRENCIES)
+    assert df_fact['data_source'].dtype == pd.CategoricalDtype(['ECB'])
+    assert isinstance(df_fact['load_timestamp'].dtype, pd.CategoricalDtype)
+    assert df_fact['rate'].dtype == np.float64
+
+
+def test_triangular_model_keeps_base_below_quote(df_base_rates):
+    df_fact = transform_to_fact_table(df_base_rates, upper_triangular=True)
+
+    _assert_rows(df_fact, _expected_rows(lambda base, quote: base < quote))
+
+
+def test_pair_rules_select_only_their_pairs(df_base_rates):
+    df_fact = transform_to_fact_table(df_base_rates, pairs=[('USD', '*'), ('SEK', 'NOK')])
+
+    _assert_rows(df_fact, _expected_rows(lambda base, quote: base == 'USD' or (base, quote) == ('SEK', 'NOK')))
+
+
+def test_build_pair_rates_zero_handling():
+    base_rates = np.array([[1.0, 2.0, 0.0]])
+
+    rate, rate_inverse = build_pair_rates(base_rates, np.array([0, 1, 2]), np.array([1, 2, 0]))
+
+    np.testing.assert_array_equal(rate, [[2.0, 0.0, 0.0]])
+    np.testing.assert_array_equal(rate_inverse, [[0.5, 0.0, 0.0]])
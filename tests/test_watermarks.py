@@ -0,0 +1,127 @@
+from datetime import date
+from itertools import product
+
+import pandas as pd
+import pytest
+
+from cloud_functions.utils.watermarks import (
+    LocalWatermarkSource,
+    _easter_sunday,
+    business_dates,
+    drop_loaded_dates,
+    plan_missing_ranges,
+    read_watermarks,
+    target_holidays,
+)
+
+
+def _fact_frame(days, currencies):
+    rows = [(day, base, quote) for day in days for base, quote in product(currencies, repeat=2) if base != quote]
+    return pd.DataFrame(rows, columns=['exchange_date', 'base_currency', 'quote_currency'])
+
+
+def _pairs(df):
+    return set(zip(df['exchange_date'].astype(str), df['base_currency'].astype(str), df['quote_currency'].astype(str)))
+
+
+@pytest.mark.parametrize('year, easter', [
+    (2000, date(2000, 4, 23)),
+    (2019, date(2019, 4, 21)),
+    (2024, date(2024, 3, 31)),
+    (2025, date(2025, 4, 20)),
+    (2038, date(2038, 4, 25)),
+])
+def test_easter_sunday_known_years(year, easter):
+    assert _easter_sunday(year) == easter
+
+
+def test_target_holidays_include_good_friday_and_easter_monday():
+    assert {date(2024, 3, 29), date(2024, 4, 1)} <= target_holidays(2024)
+    assert date(2024, 3, 31) not in business_dates(date(2024, 3, 25), date(2024, 4, 5))
+    assert date(2024, 3, 29) not in business_dates(date(2024, 3, 25), date(2024, 4, 5))
+
+
+def test_gap_spanning_a_weekend_is_one_range():
+    # Viernes 2024-01-05 y lunes 2024-01-08 sin cargar: el fin de semana no corta el rango.
+    loaded = set(business_dates(date(2024, 1, 2), date(2024, 1, 12))) - {date(2024, 1, 5), date(2024, 1, 8)}
+
+    assert plan_missing_ranges(loaded, '2024-01-02', '2024-01-12') == [('2024-01-05', '2024-01-08')]
+
+
+def test_gap_around_easter_is_one_range():
+    loaded = set(business_dates(date(2024, 3, 25), date(2024, 4, 5))) - {date(2024, 3, 28), date(2024, 4, 2)}
+
+    assert plan_missing_ranges(loaded, '2024-03-25', '2024-04-05') == [('2024-03-28', '2024-04-02')]
+
+
+def test_three_day_outage_is_one_range():
+    outage = {date(2024, 1, 10), date(2024, 1, 11), date(2024, 1, 12)}
+    source = LocalWatermarkSource(set(business_dates(date(2024, 1, 1), date(2024, 1, 31))) - outage)
+
+    loaded_dates = source.loaded_dates('2024-01-01', '2024-01-31')
+
+    assert plan_missing_ranges(loaded_dates, '2024-01-01', '2024-01-31') == [('2024-01-10', '2024-01-12')]
+
+
+def test_fully_loaded_window_has_no_ranges():
+    source = LocalWatermarkSource(business_dates(date(2024, 1, 1), date(2024, 1, 31)))
+
+    assert plan_missing_ranges(source.loaded_dates('2024-01-01', '2024-01-31'), '2024-01-01', '2024-01-31') == []
+
+
+def test_partial_date_reloads_only_pairs_with_a_missing_currency():
+    # 2024-01-02 tiene EUR, USD y JPY; 2024-01-03 le falta JPY.
+    currencies = {'EUR', 'USD', 'JPY'}
+    source = LocalWatermarkSource(
+        ['2024-01-02', '2024-01-03'],
+        currencies={'2024-01-02': currencies, '2024-01-03': {'EUR', 'USD'}},
+        row_counts={'2024-01-02': 6, '2024-01-03': 2},
+    )
+    loaded_dates, loaded_currencies = read_watermarks(source, '2024-01-02', '2024-01-03', currencies, 6)
+    df = _fact_frame(['2024-01-02', '2024-01-03'], ['EUR', 'USD', 'JPY'])
+
+    remaining = drop_loaded_dates(df, loaded_dates, loaded_currencies)
+
+    assert loaded_dates == {date(2024, 1, 2)}
+    assert _pairs(remaining) == {
+        ('2024-01-03', 'EUR', 'JPY'), ('2024-01-03', 'JPY', 'EUR'),
+        ('2024-01-03', 'USD', 'JPY'), ('2024-01-03', 'JPY', 'USD'),
+    }
+
+
+def test_complete_date_is_dropped_without_reading_currencies():
+    source = LocalWatermarkSource(['2024-01-02'], row_counts={'2024-01-02': 6})
+    loaded_dates, loaded_currencies = read_watermarks(source, '2024-01-02', '2024-01-03', {'EUR', 'USD', 'JPY'}, 6)
+    df = _fact_frame(['2024-01-02', '2024-01-03'], ['EUR', 'USD', 'JPY'])
+
+    remaining = drop_loaded_dates(df, loaded_dates, loaded_currencies)
+
+    assert loaded_currencies == {}
+    assert set(remaining['exchange_date']) == {'2024-01-03'}
+    assert len(remaining) == 6
+
+
+def test_categorical_exchange_date():
+    df = _fact_frame(['2024-01-02', '2024-01-03'], ['EUR', 'USD', 'JPY'])
+    df['exchange_date'] = pd.Categorical(df['exchange_date'], ordered=True)
+    for column in ('base_currency', 'quote_currency'):
+        df[column] = df[column].astype(pd.CategoricalDtype(['EUR', 'USD', 'JPY']))
+
+    remaining = drop_loaded_dates(df, {date(2024, 1, 2)}, {date(2024, 1, 3): {'EUR', 'USD'}})
+
+    assert _pairs(remaining) == {
+        ('2024-01-03', 'EUR', 'JPY'), ('2024-01-03', 'JPY', 'EUR'),
+        ('2024-01-03', 'USD', 'JPY'), ('2024-01-03', 'JPY', 'USD'),
+    }
+
+
+def test_wildcard_universe_drops_whole_dates():
+    # FX_CURRENCIES="*": sin universo esperado, una partición no vacía cuenta como cargada.
+    source = LocalWatermarkSource(['2024-01-02'], currencies={'2024-01-02': {'EUR'}}, row_counts={'2024-01-02': 1})
+    loaded_dates, loaded_currencies = read_watermarks(source, '2024-01-02', '2024-01-03', None)
+    df = _fact_frame(['2024-01-02', '2024-01-03'], ['EUR', 'USD'])
+
+    remaining = drop_loaded_dates(df, loaded_dates, loaded_currencies)
+
+    assert (loaded_dates, loaded_currencies) == ({date(2024, 1, 2)}, {})
+    assert _pairs(remaining) == {('2024-01-03', 'EUR', 'USD'), ('2024-01-03', 'USD', 'EUR')}